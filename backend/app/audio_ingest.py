@@ -0,0 +1,44 @@
+import asyncio
+
+import numpy as np
+
+from . import metrics
+
+# Whisper expects 16 kHz mono float32 in [-1, 1]
+SAMPLE_RATE = 16000
+
+
+class AudioDecodeError(Exception):
+    pass
+
+
+async def decode_audio(data: bytes, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """Pipe encoded audio through ffmpeg and return mono float32 PCM, no temp files."""
+    with metrics.stage("ffmpeg_decode"):
+        return await _decode_audio(data, sample_rate)
+
+
+async def _decode_audio(data: bytes, sample_rate: int) -> np.ndarray:
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            'ffmpeg', '-hide_banner', '-loglevel', 'error',
+            '-i', 'pipe:0',
+            '-f', 's16le', '-acodec', 'pcm_s16le', '-ac', '1', '-ar', str(sample_rate),
+            'pipe:1',
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+    except FileNotFoundError as e:
+        raise AudioDecodeError("ffmpeg is not installed") from e
+
+    pcm, stderr = await proc.communicate(data)
+    if proc.returncode != 0:
+        raise AudioDecodeError(stderr.decode(errors="replace").strip() or f"ffmpeg exited with {proc.returncode}")
+    return pcm_to_float32(pcm)
+
+
+def pcm_to_float32(pcm: bytes) -> np.ndarray:
+    """Convert little-endian signed 16-bit PCM to float32 samples."""
+    usable = len(pcm) - (len(pcm) % 2)
+    return np.frombuffer(pcm[:usable], dtype='<i2').astype(np.float32) / 32768.0
@@ -0,0 +1,192 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+from dotenv import load_dotenv
+from fastapi import HTTPException
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# STT_EXECUTOR: "process" (default) runs Whisper in worker processes, "thread" keeps it in-process
+# STT_WORKERS: concurrent Whisper decodes
+# IO_WORKERS: threads for network-bound translation, detection and TTS calls
+# VOICE_MAX_INFLIGHT / VOICE_MAX_QUEUE: voice requests running / waiting before we shed load
+STT_EXECUTOR = os.getenv("STT_EXECUTOR", "process")
+STT_WORKERS = int(os.getenv("STT_WORKERS", "1"))
+IO_WORKERS = int(os.getenv("IO_WORKERS", "8"))
+VOICE_MAX_INFLIGHT = int(os.getenv("VOICE_MAX_INFLIGHT", str(max(STT_WORKERS, 1) * 2)))
+VOICE_MAX_QUEUE = int(os.getenv("VOICE_MAX_QUEUE", "16"))
+VOICE_RETRY_AFTER = os.getenv("VOICE_RETRY_AFTER", "5")
+# ENABLE_VOICE: "0" makes a text-only worker (no Whisper, voice endpoints answer 503)
+# VOICE_PREWARM: "blocking" loads Whisper before the worker accepts traffic, "background"
+#                accepts traffic at once and loads alongside, "off" loads on first use
+ENABLE_VOICE = os.getenv("ENABLE_VOICE", "1").lower() not in ("0", "false", "no", "off")
+VOICE_PREWARM = os.getenv("VOICE_PREWARM", "blocking")
+
+
+def _init_stt_worker():
+    """Runs once in every STT worker process: load Whisper before the first job arrives."""
+    torch_threads = os.getenv("STT_TORCH_THREADS")
+    if torch_threads:
+        import torch
+        torch.set_num_threads(int(torch_threads))
+    from .model_registry import registry, preload_sizes
+    registry.warm(preload_sizes())
+
+
+def _stt_ping():
+    return os.getpid()
+
+
+def _stt_stats():
+    from .model_registry import registry
+    return {"pid": os.getpid(), **registry.stats()}
+
+
+class Executors:
+    """Process pool for CPU-bound Whisper, bounded thread pool for network-bound work."""
+
+    def __init__(self):
+        self._stt = None
+        self._io = None
+        self._warm_task = None
+        self.stt_state = "cold"  # cold -> warming -> ready (or failed)
+
+    @property
+    def stt(self):
+        if self._stt is None:
+            if STT_EXECUTOR == "process":
+                # spawn: forking a process that already imported torch is not safe
+                self._stt = ProcessPoolExecutor(
+                    max_workers=STT_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_stt_worker,
+                )
+            else:
+                self._stt = ThreadPoolExecutor(max_workers=STT_WORKERS, thread_name_prefix="translingo-stt")
+        return self._stt
+
+    @property
+    def io(self):
+        if self._io is None:
+            self._io = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="translingo-io")
+        return self._io
+
+    async def run_stt(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.stt, fn, *args)
+
+    async def run_io(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.io, fn, *args)
+
+    async def warm_stt(self):
+        """Start the STT workers so model loading happens before traffic arrives."""
+        self.stt_state = "warming"
+        try:
+            if STT_EXECUTOR == "process":
+                await asyncio.gather(*(self.run_stt(_stt_ping) for _ in range(STT_WORKERS)))
+            else:
+                from .model_registry import registry, preload_sizes
+                await self.run_stt(registry.warm, preload_sizes())
+        except Exception:
+            self.stt_state = "failed"
+            raise
+        self.stt_state = "ready"
+
+    async def prewarm_stt(self, mode=VOICE_PREWARM):
+        """Warm STT according to VOICE_PREWARM; "background" returns immediately."""
+        if mode == "blocking":
+            await self.warm_stt()
+        elif mode == "background":
+            self._warm_task = asyncio.create_task(self._warm_in_background())
+
+    async def _warm_in_background(self):
+        try:
+            await self.warm_stt()
+            logger.info("stt prewarm finished")
+        except Exception:
+            # Voice requests will retry the load on first use
+            logger.exception("stt prewarm failed")
+
+    async def stt_stats(self):
+        return await self.run_stt(_stt_stats)
+
+    def shutdown(self):
+        if self._warm_task is not None and not self._warm_task.done():
+            self._warm_task.cancel()
+        for pool in (self._stt, self._io):
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+        self._stt = self._io = None
+
+
+class AdmissionController:
+    """Caps in-flight voice work and rejects requests once the wait queue is full."""
+
+    def __init__(self, max_inflight=VOICE_MAX_INFLIGHT, max_queue=VOICE_MAX_QUEUE, status_code=503):
+        self.max_inflight = max_inflight
+        self.max_queue = max_queue
+        self.status_code = status_code
+        self._semaphore = asyncio.Semaphore(max_inflight)
+        self.inflight = 0
+        self.waiting = 0
+        self.rejected = 0
+        self.skipped = 0
+
+    @asynccontextmanager
+    async def slot(self):
+        if self.inflight >= self.max_inflight and self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=self.status_code,
+                detail="Voice pipeline is saturated, please retry shortly",
+                headers={"Retry-After": VOICE_RETRY_AFTER},
+            )
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.inflight += 1
+        try:
+            yield
+        finally:
+            self.inflight -= 1
+            self._semaphore.release()
+
+    @asynccontextmanager
+    async def try_slot(self):
+        """Take a slot only if one is free now and nobody is queued; yields whether it did.
+
+        For optional work (streaming partials) that should be skipped, not queued,
+        when the pipeline is busy.
+        """
+        if self.waiting or self._semaphore.locked():
+            self.skipped += 1
+            yield False
+            return
+        await self._semaphore.acquire()  # free, so this does not wait
+        self.inflight += 1
+        try:
+            yield True
+        finally:
+            self.inflight -= 1
+            self._semaphore.release()
+
+    def stats(self):
+        return {
+            "inflight": self.inflight,
+            "waiting": self.waiting,
+            "max_inflight": self.max_inflight,
+            "max_queue": self.max_queue,
+            "rejected": self.rejected,
+            "skipped": self.skipped,
+        }
+
+
+executors = Executors()
+voice_admission = AdmissionController()
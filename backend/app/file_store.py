@@ -0,0 +1,127 @@
+import hashlib
+import os
+import uuid
+
+from dotenv import load_dotenv
+from sqlalchemy.exc import IntegrityError
+
+from .models import BlobORM
+
+load_dotenv()
+
+# UPLOAD_DIR: legacy per-upload files and their file_map.json (imported once at startup)
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", os.path.join(os.path.dirname(__file__), '..', 'static', 'uploads'))
+# UPLOAD_BLOB_DIR: content-addressed store, one file per distinct SHA-256
+# MAX_UPLOAD_BYTES: uploads are rejected as soon as they stream past this size
+BLOB_DIR = os.getenv("UPLOAD_BLOB_DIR", os.path.join(UPLOAD_DIR, 'blobs'))
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(50 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+def blob_path(content_hash: str) -> str:
+    # Two-level fan-out keeps directories small
+    return os.path.join(BLOB_DIR, content_hash[:2], content_hash[2:4], content_hash)
+
+
+def stream_to_temp(source, max_bytes: int = MAX_UPLOAD_BYTES):
+    """Copy a file object in chunks, hashing as we go; returns (tmp_path, sha256, size).
+
+    Blocking: run it on the IO executor.
+    """
+    os.makedirs(BLOB_DIR, exist_ok=True)
+    tmp_path = os.path.join(BLOB_DIR, f".upload_{uuid.uuid4().hex}.tmp")
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(tmp_path, 'wb') as f:
+            for chunk in iter(lambda: source.read(UPLOAD_CHUNK_SIZE), b''):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge(f"Upload exceeds {max_bytes} bytes")
+                digest.update(chunk)
+                f.write(chunk)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return tmp_path, digest.hexdigest(), size
+
+
+def _add_reference(db, content_hash: str, size: int):
+    for _ in range(2):
+        updated = db.query(BlobORM).filter(BlobORM.content_hash == content_hash).update(
+            {BlobORM.ref_count: BlobORM.ref_count + 1}, synchronize_session=False
+        )
+        if updated:
+            db.commit()
+            return
+        db.add(BlobORM(content_hash=content_hash, size=size, ref_count=1))
+        try:
+            db.commit()
+            return
+        except IntegrityError:
+            # Someone inserted the same blob first; retry as an increment
+            db.rollback()
+    raise RuntimeError(f"Could not reference blob {content_hash}")
+
+
+def store_blob(db, tmp_path: str, content_hash: str, size: int) -> str:
+    """Take a reference, then move a streamed upload into the blob store (or drop it if the content exists).
+
+    The reference is committed before the bytes are looked at, so a concurrent
+    ``release_blob`` of the last old reference sees it and keeps the file.
+    """
+    path = blob_path(content_hash)
+    try:
+        _add_reference(db, content_hash, size)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    if os.path.exists(path):
+        os.remove(tmp_path)
+    else:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Same bytes under the same name, so a concurrent identical upload racing here is harmless
+        os.replace(tmp_path, path)
+    return path
+
+
+def release_blob(db, content_hash: str):
+    """Drop one reference; the bytes are deleted with the last one."""
+    blob = db.query(BlobORM).filter(BlobORM.content_hash == content_hash).with_for_update().first()
+    if blob is None:
+        return
+    blob.ref_count -= 1
+    if blob.ref_count > 0:
+        db.commit()
+        return
+    db.delete(blob)
+    db.commit()
+
+    # Move the bytes aside first, then look for a reference taken in the meantime:
+    # an upload that committed its reference before the move kept the existing file
+    # (put it back), one that commits after it finds no file and brings its own copy
+    path = blob_path(content_hash)
+    doomed = f"{path}.{uuid.uuid4().hex}.deleting"
+    try:
+        os.replace(path, doomed)
+    except FileNotFoundError:
+        return
+    revived = db.query(BlobORM.content_hash).filter(BlobORM.content_hash == content_hash).first()
+    if revived is not None and not os.path.exists(path):
+        os.replace(doomed, path)
+    else:
+        os.remove(doomed)
+
+
+def resolve_path(file_id: str, content_hash=None):
+    """Blob path for deduplicated uploads, legacy per-upload path otherwise; None if missing."""
+    if content_hash:
+        path = blob_path(content_hash)
+        if os.path.exists(path):
+            return path
+    legacy = os.path.join(UPLOAD_DIR, os.path.basename(file_id))
+    return legacy if os.path.exists(legacy) else None
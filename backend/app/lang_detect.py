@@ -0,0 +1,205 @@
+import bisect
+import os
+import re
+from collections import Counter
+from typing import NamedTuple, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# LANG_DETECT: "hybrid" (default) answers confident cases locally and asks the
+#              remote translator otherwise; "local" never goes remote; "remote"
+#              always does (the old behaviour)
+# LANG_DETECT_MIN_CONFIDENCE: local answers below this fall back to remote detection
+LANG_DETECT = os.getenv("LANG_DETECT", "hybrid")
+LANG_DETECT_MIN_CONFIDENCE = float(os.getenv("LANG_DETECT_MIN_CONFIDENCE", "0.8"))
+
+
+class Detection(NamedTuple):
+    lang: str
+    confidence: float
+
+
+# (first code point, last code point, script); non-overlapping, sorted
+_SCRIPT_RANGES = sorted([
+    (0x0041, 0x005A, "latin"), (0x0061, 0x007A, "latin"), (0x00C0, 0x024F, "latin"),
+    (0x1E00, 0x1EFF, "latin"),
+    (0x0370, 0x03FF, "greek"), (0x1F00, 0x1FFF, "greek"),
+    (0x0400, 0x052F, "cyrillic"),
+    (0x0530, 0x058F, "armenian"),
+    (0x0590, 0x05FF, "hebrew"),
+    (0x0600, 0x06FF, "arabic"), (0x0750, 0x077F, "arabic"), (0xFB50, 0xFDFF, "arabic"), (0xFE70, 0xFEFF, "arabic"),
+    (0x0900, 0x097F, "devanagari"),
+    (0x0980, 0x09FF, "bengali"),
+    (0x0A00, 0x0A7F, "gurmukhi"),
+    (0x0A80, 0x0AFF, "gujarati"),
+    (0x0B00, 0x0B7F, "oriya"),
+    (0x0B80, 0x0BFF, "tamil"),
+    (0x0C00, 0x0C7F, "telugu"),
+    (0x0C80, 0x0CFF, "kannada"),
+    (0x0D00, 0x0D7F, "malayalam"),
+    (0x0D80, 0x0DFF, "sinhala"),
+    (0x0E00, 0x0E7F, "thai"),
+    (0x0E80, 0x0EFF, "lao"),
+    (0x1000, 0x109F, "myanmar"),
+    (0x10A0, 0x10FF, "georgian"),
+    (0x1100, 0x11FF, "hangul"), (0x3130, 0x318F, "hangul"), (0xAC00, 0xD7AF, "hangul"),
+    (0x1200, 0x139F, "ethiopic"),
+    (0x1780, 0x17FF, "khmer"),
+    (0x3040, 0x30FF, "kana"), (0x31F0, 0x31FF, "kana"),
+    (0x3400, 0x4DBF, "han"), (0x4E00, 0x9FFF, "han"), (0xF900, 0xFAFF, "han"),
+])
+_RANGE_STARTS = [start for start, _, _ in _SCRIPT_RANGES]
+
+# Candidate languages per script (googletrans codes), most likely first. A
+# declared language in the list wins; otherwise distinctive letters decide.
+SCRIPT_LANGUAGES = {
+    "greek": ("el",),
+    "cyrillic": ("ru", "uk", "bg", "sr", "mk", "be", "kk", "ky", "mn", "tg"),
+    "armenian": ("hy",),
+    "hebrew": ("iw", "he", "yi"),
+    "arabic": ("ar", "ur", "fa", "ps", "sd", "ug", "ku"),
+    "devanagari": ("hi", "mr", "ne", "sa"),
+    "bengali": ("bn",),
+    "gurmukhi": ("pa",),
+    "gujarati": ("gu",),
+    "oriya": ("or",),
+    "tamil": ("ta",),
+    "telugu": ("te",),
+    "kannada": ("kn",),
+    "malayalam": ("ml",),
+    "sinhala": ("si",),
+    "thai": ("th",),
+    "lao": ("lo",),
+    "myanmar": ("my",),
+    "georgian": ("ka",),
+    "hangul": ("ko",),
+    "ethiopic": ("am",),
+    "khmer": ("km",),
+    "kana": ("ja",),
+    "han": ("zh-cn", "zh-tw", "ja"),
+}
+
+# Confidence for the first candidate when neither the prior nor a distinctive
+# letter settles it (e.g. Devanagari without context is usually Hindi)
+_DEFAULT_CONFIDENCE = {"devanagari": 0.85, "han": 0.85, "cyrillic": 0.7, "arabic": 0.6, "hebrew": 0.9}
+
+# Letters that only one language of a script family uses
+_DISTINCTIVE_LETTERS = {
+    "cyrillic": (("uk", set("іїєґ")), ("be", set("ў")), ("sr", set("ђћџљњ")), ("mk", set("ѓќѕ")),
+                 ("kk", set("әғқңөұүһ")), ("bg", set("ъ"))),
+    "arabic": (("ur", set("ٹڈڑںے")), ("fa", set("پچژگ"))),
+}
+
+# Function words per Latin-script language: a handful of hits is a strong signal
+_LATIN_STOPWORDS = {
+    "en": set("the and is are you of to in it that this what have for not with was be my your do i me".split()),
+    "es": set("el la los las de que y es en un una por para con no qué como está estoy pero muy mi tu yo".split()),
+    "fr": set("le la les des de du et est un une je tu il vous nous pas que qui pour avec dans sur mais très".split()),
+    "de": set("der die das und ist nicht ich du ein eine zu mit auf für sie wir den dem von wie was auch".split()),
+    "it": set("il lo la gli le di che e è un una per con non sono sei io tu ma come perché molto".split()),
+    "pt": set("o os as de que e é um uma do da em para com não eu você mas como muito está estou".split()),
+    "nl": set("de het een en is niet ik je jij wij zijn van dat wat met voor op maar ook".split()),
+    "id": set("yang dan di ini itu tidak saya kamu apa ada untuk dengan ke dari akan sudah".split()),
+    "tr": set("bir ve bu da de ne için ben sen değil çok var mı mi ama gibi".split()),
+}
+_LATIN_HINTS = {
+    "es": set("ñ¿¡"), "de": set("ß"), "pt": set("ãõ"), "tr": set("ğış"), "fr": set("œ"),
+}
+_WORD = re.compile(r"[^\W\d_]+", re.UNICODE)
+
+
+def _script_of(ch: str) -> Optional[str]:
+    cp = ord(ch)
+    i = bisect.bisect_right(_RANGE_STARTS, cp) - 1
+    if i >= 0 and cp <= _SCRIPT_RANGES[i][1]:
+        return _SCRIPT_RANGES[i][2]
+    return None
+
+
+def _detect_latin(text: str, prior: Optional[str]) -> Detection:
+    lowered = text.lower()
+    words = _WORD.findall(lowered)
+    scores = Counter()
+    for word in words:
+        for lang, stopwords in _LATIN_STOPWORDS.items():
+            if word in stopwords:
+                scores[lang] += 1
+    for lang, letters in _LATIN_HINTS.items():
+        if any(ch in letters for ch in lowered):
+            scores[lang] += 2
+
+    ranked = scores.most_common(2)
+    best_lang, best = ranked[0] if ranked else (None, 0)
+    second = ranked[1][1] if len(ranked) > 1 else 0
+    prior_is_latin = prior is not None and not _non_latin_prior(prior)
+
+    # The prior is the sender's display language, not proof of what they typed:
+    # it only breaks ties once the text itself points at it
+    if prior_is_latin and best and scores.get(prior, 0) >= best:
+        return Detection(prior, 0.9)
+    if best >= 2 and best >= 2 * second:
+        return Detection(best_lang, min(0.6 + 0.1 * (best - second), 0.95))
+    if best_lang is not None:
+        return Detection(best_lang, 0.5)
+    # No evidence either way ("Gracias", "Danke schön"): below any sane threshold
+    return Detection(prior or "en", 0.3)
+
+
+def _non_latin_prior(prior: str) -> bool:
+    return any(prior in langs for langs in SCRIPT_LANGUAGES.values())
+
+
+def detect(text: str, prior: Optional[str] = None) -> Detection:
+    """Guess the language of ``text`` from its script and function words.
+
+    ``prior`` is the sender's declared language; it decides ambiguous cases.
+    Pure Python, no I/O: meant to run inline on the event loop.
+    """
+    counts = Counter()
+    for ch in text:
+        if ch.isalpha():
+            script = _script_of(ch)
+            if script is not None:
+                counts[script] += 1
+    if not counts:
+        # Emoji, numbers, punctuation: nothing to detect, keep the sender's language
+        return Detection(prior or "en", 1.0 if prior else 0.5)
+
+    # Japanese mixes kana and kanji; any kana means Japanese
+    if counts.get("kana") and counts.get("han"):
+        counts["kana"] += counts.pop("han")
+    script, letters = counts.most_common(1)[0]
+    share = letters / sum(counts.values())
+
+    if script == "latin":
+        detection = _detect_latin(text, prior)
+    else:
+        candidates = SCRIPT_LANGUAGES[script]
+        distinctive = None
+        for lang, letters_of_lang in _DISTINCTIVE_LETTERS.get(script, ()):
+            if any(ch in letters_of_lang for ch in text.lower()):
+                distinctive = lang
+                break
+        if distinctive is not None:
+            detection = Detection(distinctive, 0.95 if distinctive == prior else 0.9)
+        elif len(candidates) == 1:
+            detection = Detection(candidates[0], 0.99)
+        elif prior == candidates[0]:
+            # Declared language and the script's usual language agree
+            detection = Detection(prior, 0.9)
+        elif prior in candidates:
+            # Plausible but unproven (e.g. Han text from a Japanese speaker): ask remote
+            detection = Detection(prior, 0.6)
+        else:
+            detection = Detection(candidates[0], _DEFAULT_CONFIDENCE.get(script, 0.6))
+
+    # Mixed-script text (e.g. Hindi with English words) is less certain
+    if share < 0.8:
+        detection = Detection(detection.lang, detection.confidence * share)
+    return detection
+
+
+def is_confident(detection: Detection) -> bool:
+    return detection.confidence >= LANG_DETECT_MIN_CONFIDENCE
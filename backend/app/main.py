@@ -1,37 +1,68 @@
 from fastapi import (
     FastAPI, WebSocket, WebSocketDisconnect,
-    Depends, UploadFile, File, Form, status, HTTPException
+    Depends, UploadFile, File, Form, Query, status, HTTPException, Request
 )
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse
-from .db import get_db, init_db
-from .models import Message
+from fastapi.responses import JSONResponse, FileResponse, Response, StreamingResponse
+from .db import get_db, init_db, SessionLocal
+from .models import Message, MessageTranslation, StoredFile
+from .file_store import (
+    UPLOAD_DIR, MAX_UPLOAD_BYTES, UploadTooLarge,
+    stream_to_temp, store_blob, release_blob, resolve_path,
+)
 from .schemas import MessageCreate
 
 import asyncio
 import json
+import logging
+import mimetypes
 import base64
 import os
+import re
 import uuid
-from typing import Dict, List
+from typing import Dict, List, Optional
 from datetime import datetime
 from googletrans import Translator, LANGUAGES
 import uuid
 import os
 import base64
-from .voice_translator import speech_to_text, translate_text, speak_text
+from .voice_translator import speech_to_text
+from .executors import executors, voice_admission, ENABLE_VOICE, VOICE_PREWARM
+from .persistence import message_writer
+from .audio_ingest import decode_audio, AudioDecodeError, SAMPLE_RATE
+from .vad import trim_silence
+from .voice_stream import VoiceStream, VOICE_STREAM_INTERVAL_MS
+from .translation_cache import translation_cache
+from .translate_batcher import translation_batcher
+from . import lang_detect
+from .voice_pipeline import render_voice_variant, render_voice_variants
+from .tts_cache import tts_cache
+from .room_bus import RoomBus, room_bus
+from .send_queue import ClientSender
+from .room_buffer import RoomBuffer
+from . import metrics
+from .metrics import EVICTIONS, LANG_DETECTIONS, VOICE_AUDIO_SECONDS, VOICE_NO_SPEECH
 from fastapi import WebSocket
 from fastapi.staticfiles import StaticFiles
-import shutil
 
+# LOG_LEVEL: DEBUG logs every message/voice request; INFO (default) keeps the hot path quiet
+logging.basicConfig(
+    level=os.getenv("LOG_LEVEL", "INFO").upper(),
+    format="%(asctime)s %(levelname)s %(name)s %(message)s",
+)
+logger = logging.getLogger("translingo")
 
 app = FastAPI()
 
 # Ensure uploads directory exists
-import os
-UPLOAD_DIR = os.path.join(os.path.dirname(__file__), '..', 'static', 'uploads')
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+# /history page size (default and upper bound)
+HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", "100"))
+HISTORY_MAX_PAGE_SIZE = int(os.getenv("HISTORY_MAX_PAGE_SIZE", "1000"))
+# Concurrent translations per batch when backfilling /history?lang=
+HISTORY_TRANSLATE_BATCH = int(os.getenv("HISTORY_TRANSLATE_BATCH", "20"))
+
 # Serve static files
 app.mount('/static', StaticFiles(directory=os.path.join(os.path.dirname(__file__), '..', 'static')), name='static')
 
@@ -44,118 +75,596 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Multipart boundaries and the room/username fields on top of the file itself
+UPLOAD_FORM_OVERHEAD = 64 * 1024
+
+class UploadSizeLimit:
+    """Rejects upload bodies past their cap while they stream in.
+
+    The multipart parser spools the whole body before ``upload_file`` runs, so
+    the cap has to be enforced on the raw request, not on the parsed file.
+    """
+
+    def __init__(self, app, path: str, max_bytes: int):
+        self.app = app
+        self.path = path
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] != self.path:
+            return await self.app(scope, receive, send)
+        detail = f"Upload exceeds {MAX_UPLOAD_BYTES} bytes"
+        length = dict(scope["headers"]).get(b"content-length", b"")
+        if length.isdigit() and int(length) > self.max_bytes:
+            return await JSONResponse({"detail": detail}, status_code=413)(scope, receive, send)
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # Chunked bodies have no Content-Length: stop reading mid-stream
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+app.add_middleware(UploadSizeLimit, path="/upload_file", max_bytes=MAX_UPLOAD_BYTES + UPLOAD_FORM_OVERHEAD)
+
 # WebSocket Connection Manager
 class ConnectionManager:
-    def __init__(self):
+    """Tracks this node's sockets; rooms span nodes through the room bus."""
+
+    def __init__(self, bus: RoomBus):
+        self.bus = bus
         self.active_connections: Dict[str, List[WebSocket]] = {}
         self.user_info: Dict[WebSocket, Dict] = {}
+        self.senders: Dict[WebSocket, ClientSender] = {}
+        self.rooms: Dict[WebSocket, str] = {}
+        self.recent: Dict[str, RoomBuffer] = {}
+        self._audio_stores = set()  # background tts_cache writes; keeps the tasks referenced
+        # Sockets replaying missed messages: live traffic is held here until the replay is out
+        self.resuming: Dict[WebSocket, list] = {}
 
     async def connect(self, room: str, websocket: WebSocket):
         await websocket.accept()
         if room not in self.active_connections:
             self.active_connections[room] = []
         self.active_connections[room].append(websocket)
+        self.rooms[websocket] = room
+        sender = ClientSender(websocket, self._evict)
+        sender.start()
+        self.senders[websocket] = sender
 
-    def disconnect(self, room: str, websocket: WebSocket):
-        self.active_connections[room].remove(websocket)
-        if not self.active_connections[room]:
-            del self.active_connections[room]
-        if websocket in self.user_info:
-            del self.user_info[websocket]
+    async def register(self, room: str, websocket: WebSocket, info: Dict, last_seen: Optional[str] = None):
+        """Attach user info once the init message arrives and announce presence.
 
-    async def broadcast(self, room: str, message: dict, sender_ws: WebSocket = None):
-        if room in self.active_connections:
-            for connection in self.active_connections[room]:
-                user_info = self.user_info.get(connection, {})
-                preferred_language = user_info.get("preferred_language", "en")
-
-                if message.get("type") == "file":
-                    # For file messages, just send as is
-                    try:
-                        await connection.send_json(message)
-                        print(f"📢 Sent file to {user_info.get('username')}: {message.get('file_name')}")
-                    except Exception as e:
-                        print(f"❌ Error sending file to user: {e}")
+        With ``last_seen`` (a message uid) the socket starts resuming: returns the
+        buffered messages it missed (None if the buffer no longer reaches back that
+        far) and holds live traffic until ``replay`` has sent them.
+        """
+        missed = None
+        if last_seen:
+            # Snapshot and start holding in the same step, so nothing is lost or sent twice
+            buffer = self.recent.get(room)
+            missed = buffer.since(last_seen) if buffer is not None else None
+            self.resuming[websocket] = []
+        self.user_info[websocket] = info
+        await self.bus.join(room, info["preferred_language"])
+        return missed
+
+    async def replay(self, room: str, websocket: WebSocket, last_seen: str, missed):
+        """Send a resuming socket what it missed, from memory or else from the database."""
+        info = self.user_info.get(websocket, {})
+        lang = info.get("preferred_language", "en")
+        mode = info.get("audio_mode", "base64")
+        sent = set()
+        source = "memory"
+        try:
+            if missed is not None:
+                for uid, renders in missed:
+                    payload = await self._render_missed(renders, lang, mode)
+                    if payload is not None:
+                        self._enqueue(websocket, payload)
+                        sent.add(uid)
+            else:
+                items = await history_since(room, last_seen, lang)
+                if items is None:
+                    source = "unknown"  # not buffered, not stored: the client should reload /history
                 else:
-                    # For text messages, handle translation
-                    translated_content = message["content"]
-                    if preferred_language != message.get("detected_language", "en"):
-                        translated_content = await async_translate_text(
-                            message["content"], preferred_language
-                        )
-
-                    msg_to_send = message.copy()
-                    msg_to_send["content"] = translated_content
-
-                    try:
-                        await connection.send_json(msg_to_send)
-                        print(f"📢 Sent to {user_info.get('username')}: {translated_content}")
-                    except Exception as e:
-                        print(f"❌ Error sending to user: {e}")
-
-manager = ConnectionManager()
+                    source = "database"
+                    self._enqueue(websocket, json.dumps({
+                        "type": "history",
+                        "messages": items,
+                        "complete": len(items) < HISTORY_MAX_PAGE_SIZE,
+                    }))
+                    sent.update(item["uid"] for item in items)
+            self._enqueue(websocket, json.dumps({
+                "type": "resume", "last_seen": last_seen, "source": source, "replayed": len(sent),
+            }))
+        finally:
+            for payload, coalesce_key, uid in self.resuming.pop(websocket, []):
+                if uid is None or uid not in sent:
+                    self._enqueue(websocket, payload, coalesce_key)
+        logger.debug("resume room=%s source=%s replayed=%d", room, source, len(sent))
+
+    async def _render_missed(self, renders: Dict, lang: str, mode: str):
+        envelope = renders.get(lang) or renders.get(None)
+        if envelope is None:
+            # Nobody listened in this language when it was sent: render it now
+            original = next(iter(renders.values()))
+            if original["kind"] == "voice":
+                message = original["message"]
+                variant = await render_voice_variant(
+                    message["original_content"], message.get("original_language") or "auto", lang
+                )
+                return build_voice_payload({**message, "content": variant["content"]}, variant, mode)
+            message = json.loads(original["text"])
+            content = await async_translate_text(
+                message["original_content"], lang, message.get("original_language") or "auto"
+            )
+            envelope = renders[lang] = {**original, "text": json.dumps({**message, "content": content})}
+        if envelope["kind"] == "voice":
+            # The buffer keeps only the digest; the clip itself is in the TTS cache
+            digest = envelope["audio_digest"]
+            audio = await executors.run_io(tts_cache.read, digest) if digest else None
+            return build_voice_payload(envelope["message"], {"audio_digest": digest, "audio_bytes": audio}, mode)
+        return envelope["text"]
+
+    async def update_language(self, room: str, websocket: WebSocket, new_lang: str):
+        info = self.user_info[websocket]
+        old_lang = info["preferred_language"]
+        info["preferred_language"] = new_lang
+        if old_lang != new_lang:
+            await self.bus.leave(room, old_lang)
+            await self.bus.join(room, new_lang)
+
+    async def disconnect(self, room: str, websocket: WebSocket):
+        """Forget a socket; safe to call more than once."""
+        if websocket in self.active_connections.get(room, []):
+            self.active_connections[room].remove(websocket)
+            if not self.active_connections[room]:
+                del self.active_connections[room]
+                # Nothing is delivered here for a room without local listeners, so its buffer would have gaps
+                self.recent.pop(room, None)
+        self.rooms.pop(websocket, None)
+        self.resuming.pop(websocket, None)
+        sender = self.senders.pop(websocket, None)
+        if sender is not None:
+            await sender.close()
+        info = self.user_info.pop(websocket, None)
+        if info is not None:
+            await self.bus.leave(room, info["preferred_language"])
+
+    async def _evict(self, websocket: WebSocket, reason: str, code=None):
+        """Drop a dead or hopelessly slow socket (called by its ClientSender)."""
+        username = self.user_info.get(websocket, {}).get("username")
+        room = self.rooms.get(websocket)
+        EVICTIONS.inc()
+        logger.warning("evict username=%s room=%s reason=%s", username, room, reason)
+        if room is not None:
+            await self.disconnect(room, websocket)
+        try:
+            await websocket.close(code=code or status.WS_1011_INTERNAL_ERROR)
+        except Exception:
+            pass
+
+    def send(self, websocket: WebSocket, payload, coalesce_key=None, uid=None):
+        """Queue a pre-serialized payload for one socket without waiting on the network."""
+        held = self.resuming.get(websocket)
+        if held is not None:
+            held.append((payload, coalesce_key, uid))
+            return
+        self._enqueue(websocket, payload, coalesce_key)
+
+    def _enqueue(self, websocket: WebSocket, payload, coalesce_key=None):
+        sender = self.senders.get(websocket)
+        if sender is not None:
+            sender.enqueue(payload, coalesce_key)
+
+    def send_json(self, websocket: WebSocket, data: dict):
+        self.send(websocket, json.dumps(data))
+
+    async def broadcast(self, room: str, message: dict, sender_ws: WebSocket = None):
+        """Publish once per listening language (cluster-wide); nodes fan out locally."""
+        if message.get("type") == "file":
+            # File messages are identical for everyone: serialize once
+            await self.bus.publish(room, None, {"kind": "text", "text": json.dumps(message), "uid": message.get("uid")})
+            return
+
+        languages = await self.bus.languages(room)
+        if not languages:
+            return
+        source_lang = message.get("detected_language", "en")
+
+        async def render(lang):
+            if lang == source_lang:
+                return message["content"]
+            # The known source keeps each (src, dest) batch to one language
+            return await translate_or_none(message["content"], lang, source_lang)
+
+        languages = list(languages)
+        translated = await asyncio.gather(*(render(lang) for lang in languages))
+        rendered = [message["content"] if content is None else content for content in translated]
+        with metrics.stage("broadcast"):
+            await asyncio.gather(*(
+                self.bus.publish(room, lang, {
+                "kind": "text", "text": json.dumps({**message, "content": content}), "uid": message.get("uid"),
+            })
+                for lang, content in zip(languages, rendered)
+            ))
+        logger.debug("broadcast room=%s languages=%d", room, len(languages))
+
+        # Keep the translations so /history?lang= can serve them later, including ones
+        # identical to the original ("ok", names, URLs); failed ones are retried there
+        if message.get("uid"):
+            await message_writer.submit_translations([
+                {"message_uid": message["uid"], "language": lang, "content": content}
+                for lang, content in zip(languages, translated)
+                if lang != source_lang and content is not None
+            ])
+
+    async def deliver(self, room: str, lang: Optional[str], envelope: dict):
+        """Room bus callback: send one published envelope to this node's sockets."""
+        uid = envelope.get("uid")
+        audio_stored = None
+        if envelope["kind"] == "voice" and envelope["audio"]:
+            # Keep a local copy so this node can serve /tts/{audio_id}. Written on the
+            # I/O pool: the bus delivers one envelope at a time, so disk writes and
+            # evictions here would hold up every room on the node
+            audio_stored = asyncio.ensure_future(
+                executors.run_io(tts_cache.store, envelope["audio_digest"], envelope["audio"])
+            )
+            self._audio_stores.add(audio_stored)
+            audio_stored.add_done_callback(self._audio_store_done)
+        if envelope.get("coalesce") is None and room in self.active_connections:
+            # Keep it for resume (partial captions are not worth replaying; audio stays in the TTS cache)
+            buffered = {**envelope, "audio": None} if envelope["kind"] == "voice" else envelope
+            self.recent.setdefault(room, RoomBuffer()).add(uid, lang, buffered)
+
+        if lang is None:
+            members = list(self.active_connections.get(room, []))
+        else:
+            members = self.group_by_language(room).get(lang, [])
+        if not members:
+            return
+
+        if envelope["kind"] == "voice":
+            # Audio arrives once per language; render it once per delivery mode
+            variant = {"audio_digest": envelope["audio_digest"], "audio_bytes": envelope["audio"]}
+            groups, payloads = {}, {}
+            for ws in members:
+                mode = self.user_info.get(ws, {}).get("audio_mode", "base64")
+                if mode not in payloads:
+                    payloads[mode] = build_voice_payload(envelope["message"], variant, mode)
+                groups.setdefault(mode, []).append(ws)
+            if "url" in groups and audio_stored is not None:
+                # URL clients fetch the clip right away; it has to be on disk first
+                await asyncio.wait({audio_stored})
+            self.send_grouped(groups, payloads, uid=uid)
+        else:
+            self.send_grouped({None: members}, {None: envelope["text"]}, envelope.get("coalesce"), uid)
+
+    def _audio_store_done(self, task):
+        self._audio_stores.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("tts cache store failed error=%s", task.exception())
+
+    def group_by_language(self, room: str) -> Dict[str, List[WebSocket]]:
+        groups: Dict[str, List[WebSocket]] = {}
+        for connection in self.active_connections.get(room, []):
+            info = self.user_info.get(connection)
+            if info is None:
+                continue  # still waiting for its init message
+            groups.setdefault(info.get("preferred_language", "en"), []).append(connection)
+        return groups
+
+    def send_grouped(self, groups: Dict, payloads: Dict, coalesce_key=None, uid=None):
+        """Queue each group its pre-serialized payload on every member's send queue.
+
+        A payload is a JSON string or a sequence of frames (str -> text frame, bytes -> binary frame).
+        """
+        for key, members in groups.items():
+            for connection in members:
+                self.send(connection, payloads[key], coalesce_key, uid)
+
+    def queue_stats(self):
+        depths = [sender.depth for sender in self.senders.values()]
+        return {
+            "sockets": len(depths),
+            "max_depth": max(depths, default=0),
+            "total_depth": sum(depths),
+            "dropped": sum(sender.dropped for sender in self.senders.values()),
+        }
+
+manager = ConnectionManager(room_bus)
 translator = Translator()
 
 # --- Utility Functions ---
-async def async_translate_text(text, dest_lang):
-    loop = asyncio.get_event_loop()
+async def translate_or_none(text, dest_lang, src_lang="auto"):
+    """Translation of ``text``, or None if the translator failed (so callers never store a fallback)."""
+    cached = translation_cache.get(text, src_lang, dest_lang, use_store=False)
+    if cached is not None:
+        return cached
     try:
-        result = await loop.run_in_executor(
-            None, lambda: translator.translate(text, dest=dest_lang)
-        )
-        return result.text
-    except Exception as e:
-        print(f"⚠️ Translation failed: {e}")
-        return text
+        # Coalesced with concurrent requests into one backend call per language pair
+        return await translation_batcher.translate(text, src_lang, dest_lang)
+    except Exception:
+        return None  # already logged once for the whole batch
 
-async def detect_language(text):
-    loop = asyncio.get_event_loop()
+async def async_translate_text(text, dest_lang, src_lang="auto"):
+    translated = await translate_or_none(text, dest_lang, src_lang)
+    return text if translated is None else translated
+
+async def detect_language(text, prior=None):
+    """Detect locally when confident (``prior`` is the sender's declared language), else ask googletrans."""
+    guess = None
+    if lang_detect.LANG_DETECT != "remote":
+        guess = lang_detect.detect(text, prior)
+        if lang_detect.LANG_DETECT == "local" or lang_detect.is_confident(guess):
+            LANG_DETECTIONS.inc(source="local")
+            return guess.lang
+    LANG_DETECTIONS.inc(source="remote")
     try:
-        result = await loop.run_in_executor(None, lambda: translator.detect(text))
+        with metrics.stage("detect"):
+            result = await executors.run_io(lambda: translator.detect(text))
         return result.lang
     except Exception as e:
-        print(f"⚠️ Language detection failed: {e}")
-        return "en"
+        logger.warning("detect failed error=%s", e)
+        return guess.lang if guess else (prior or "en")
+
+AUDIO_MODES = ("base64", "binary", "url")
+
+def build_voice_payload(message: dict, variant: dict, audio_mode: str):
+    """Serialize one voice variant for one delivery mode (see AUDIO_MODES)."""
+    audio_bytes = variant["audio_bytes"]
+    if not audio_bytes:
+        return json.dumps({**message, "audio_base64": None})
+    if audio_mode == "base64":
+        return json.dumps({**message, "audio_base64": base64.b64encode(audio_bytes).decode('utf-8')})
+    meta = {
+        **message,
+        "audio_id": variant["audio_digest"],
+        "audio_url": f"/tts/{variant['audio_digest']}",
+        "audio_format": "mp3",
+        "audio_size": len(audio_bytes),
+    }
+    if audio_mode == "binary":
+        # The next binary frame on this socket carries the audio
+        return (json.dumps({**meta, "audio_frame": True}), audio_bytes)
+    return json.dumps(meta)
 
 # --- Startup Hook ---
 @app.on_event("startup")
-def on_startup():
+async def on_startup():
     init_db()
-    print("[STARTED] Server is up and database initialized.")
+    db = SessionLocal()
+    try:
+        migrated = StoredFile.migrate_file_map(db, UPLOAD_DIR)
+        if migrated:
+            logger.info("startup migrated_file_map_entries=%d", migrated)
+    finally:
+        db.close()
+    await message_writer.start()
+    await room_bus.start(manager.deliver)
+    if ENABLE_VOICE:
+        await executors.prewarm_stt()
+    logger.info("startup complete: server is up and database initialized voice=%s", ENABLE_VOICE)
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await room_bus.stop()
+    await message_writer.stop()
+    executors.shutdown()
+
+def drop_silence(samples):
+    """Trim silence and long pauses before Whisper; empty when the clip has no speech."""
+    with metrics.stage("vad"):
+        speech_only, speech = trim_silence(samples)
+    VOICE_AUDIO_SECONDS.inc(speech.total_seconds, kind="decoded")
+    VOICE_AUDIO_SECONDS.inc(len(speech_only) / SAMPLE_RATE, kind="speech")
+    if not len(speech_only):
+        VOICE_NO_SPEECH.inc()
+    return speech_only
+
+async def voice_slot():
+    """Hold an admission slot for the lifetime of a voice request (503 when saturated)."""
+    if not ENABLE_VOICE:
+        raise HTTPException(status_code=503, detail="Voice is disabled on this worker")
+    async with voice_admission.slot():
+        yield
+
+# --- Streaming Voice ---
+class VoiceStreamSession:
+    """A live voice stream on a room socket.
+
+    While audio arrives, partial captions go to the room: the raw transcript to
+    listeners of the spoken language, translations of its stable prefix to the
+    others. On end, the final transcript takes the normal voice path (text + audio).
+    """
+
+    # Final messages still being transcribed after voice_end; keeps the tasks referenced
+    finishing = set()
+
+    def __init__(self, room: str, username: str, websocket: WebSocket, language: str):
+        self.room = room
+        self.username = username
+        self.websocket = websocket
+        self.stream = VoiceStream(uuid.uuid4().hex, language)
+        self.stream_id = self.stream.stream_id
+        self._published = {}  # lang -> last caption sent
+        self._translated = {}  # lang -> (stable source text, translation)
+        self._task = asyncio.create_task(self._run_partials())
+
+    def feed(self, chunk: bytes) -> bool:
+        return self.stream.feed(chunk)
+
+    async def _transcribe(self, samples, endpoint):
+        with metrics.stage("stt_partial" if endpoint == "voice_stream" else "stt"):
+            return await executors.run_stt(speech_to_text, samples, self.stream.language, endpoint)
+
+    async def _run_partials(self):
+        while True:
+            await asyncio.sleep(VOICE_STREAM_INTERVAL_MS / 1000)
+            try:
+                # Partial decodes share the voice budget but never queue for it:
+                # finishing messages matters more than captions
+                async with voice_admission.try_slot() as admitted:
+                    if not admitted:
+                        continue
+                    update = await self.stream.step(lambda samples: self._transcribe(samples, "voice_stream"))
+                if update:
+                    await self._publish_partial(update)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("voice stream partial failed stream=%s", self.stream_id)
+
+    async def _caption(self, lang, update):
+        source = self.stream.language
+        if lang == source:
+            return update["text"]
+        stable = update["stable"]
+        if not stable:
+            return None
+        cached = self._translated.get(lang)
+        if cached is None or cached[0] != stable:
+            cached = self._translated[lang] = (stable, await async_translate_text(stable, lang, source))
+        return cached[1]
+
+    async def _publish_partial(self, update):
+        languages = list(await manager.bus.languages(self.room))
+        captions = await asyncio.gather(*(self._caption(lang, update) for lang in languages))
+        base = {
+            "type": "voice_partial",
+            "stream_id": self.stream_id,
+            "username": self.username,
+            "room": self.room,
+            "original_language": self.stream.language,
+            "original_content": update["text"],
+            "final": False,
+        }
+        publishes = []
+        for lang, caption in zip(languages, captions):
+            if caption is None or self._published.get(lang) == caption:
+                continue
+            self._published[lang] = caption
+            # Coalesced: a slow client only keeps the newest caption of each stream
+            publishes.append(manager.bus.publish(self.room, lang, {
+                "kind": "text",
+                "text": json.dumps({**base, "content": caption}),
+                "coalesce": f"voice_partial:{self.stream_id}",
+            }))
+        await asyncio.gather(*publishes)
+
+    async def cancel(self):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+    def end(self):
+        """Stop captions and publish the final message in the background."""
+        task = asyncio.create_task(self._finish())
+        VoiceStreamSession.finishing.add(task)
+        task.add_done_callback(VoiceStreamSession.finishing.discard)
+
+    async def _finish(self):
+        await self.cancel()
+        try:
+            async with voice_admission.slot():
+                text = await self.stream.finish(lambda samples: self._transcribe(samples, "voice_message"))
+                logger.debug("voice stream=%s seconds=%.1f transcript=%r", self.stream_id, self.stream.seconds, text)
+                if text:
+                    await publish_voice(self.room, self.username, self.stream.language, text,
+                                        extra={"stream_id": self.stream_id})
+                else:
+                    VOICE_NO_SPEECH.inc()
+                    manager.send_json(self.websocket, {"type": "voice_no_speech", "stream_id": self.stream_id})
+        except HTTPException as e:
+            manager.send_json(self.websocket, {"error": e.detail, "stream_id": self.stream_id})
+        except Exception:
+            logger.exception("voice stream final failed stream=%s", self.stream_id)
+            manager.send_json(self.websocket, {"error": "Speech-to-text failed", "stream_id": self.stream_id})
 
 # --- WebSocket Endpoint ---
 @app.websocket("/ws/{room}/{username}")
-async def websocket_endpoint(websocket: WebSocket, room: str, username: str, db=Depends(get_db)):
+async def websocket_endpoint(websocket: WebSocket, room: str, username: str):
     await manager.connect(room, websocket)
-    print(f"🧠 {username} joined room {room}")
+    logger.info("join username=%s room=%s", username, room)
+    stream = None
 
     try:
         try:
             init_data = await websocket.receive_json()
-            print("🌐 Received init data:", init_data)
+            logger.debug("init username=%s data=%s", username, init_data)
         except Exception as e:
-            print("❌ Failed to receive JSON:", e)
+            logger.warning("init failed username=%s room=%s error=%s", username, room, e)
             await websocket.send_json({"error": "Invalid initialization data"})
             await websocket.close()
+            await manager.disconnect(room, websocket)
             return
 
         preferred_language = init_data.get("preferred_language", "en")
-        manager.user_info[websocket] = {
-            "username": username,
-            "preferred_language": preferred_language,
-        }
-
-        await websocket.send_json({
+        # How voice audio is delivered: "base64" inside JSON (default), "binary"
+        # (JSON metadata frame followed by a raw binary frame) or "url" (fetch /tts/{audio_id})
+        audio_mode = init_data.get("audio_mode", "base64")
+        if audio_mode not in AUDIO_MODES:
+            audio_mode = "base64"
+        # Reconnecting clients pass the uid of the last message they saw to get only what they missed
+        last_seen = init_data.get("last_seen")
+        manager.send_json(websocket, {
             "info": f"Joined room {room} as {username} with language {preferred_language}"
         })
+        missed = await manager.register(room, websocket, {
+            "username": username,
+            "preferred_language": preferred_language,
+            "audio_mode": audio_mode,
+        }, last_seen=last_seen)
+        if last_seen:
+            await manager.replay(room, websocket, last_seen, missed)
 
         while True:
-            data = await websocket.receive_json()
+            frame = await websocket.receive()
+            if frame["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(frame.get("code", status.WS_1000_NORMAL_CLOSURE))
+
+            if frame.get("bytes") is not None:
+                # Binary frames carry audio for the active voice stream
+                if stream is None:
+                    manager.send_json(websocket, {"error": "Send voice_start before streaming audio"})
+                elif not stream.feed(frame["bytes"]):
+                    stream.end()  # hit VOICE_STREAM_MAX_SECONDS
+                    stream = None
+                continue
+
+            data = json.loads(frame["text"])
+
+            if data.get("type") == "voice_start":
+                if not ENABLE_VOICE:
+                    manager.send_json(websocket, {"error": "Voice is disabled on this worker"})
+                    continue
+                if stream is not None:
+                    await stream.cancel()
+                language = manager.user_info[websocket]["preferred_language"]
+                stream = VoiceStreamSession(room, username, websocket, language)
+                manager.send_json(websocket, {"type": "voice_started", "stream_id": stream.stream_id})
+                continue
+
+            if data.get("type") == "voice_end":
+                if stream is not None:
+                    stream.end()
+                    stream = None
+                continue
 
             if data.get("type") == "update_language":
                 new_lang = data.get("preferred_language", "en")
-                manager.user_info[websocket]["preferred_language"] = new_lang
-                await websocket.send_json({"info": f"Language updated to {new_lang}"})
+                await manager.update_language(room, websocket, new_lang)
+                manager.send_json(websocket, {"info": f"Language updated to {new_lang}"})
                 continue
 
             if data.get("type") == "file":
@@ -163,15 +672,19 @@ async def websocket_endpoint(websocket: WebSocket, room: str, username: str, db=
                 continue
 
             content = data["content"]
-            detected_language = await detect_language(content)
+            sender_language = manager.user_info.get(websocket, {}).get("preferred_language", preferred_language)
+            detected_language = await detect_language(content, prior=sender_language)
 
             msg = MessageCreate(
                 username=username,
                 room=room,
                 content=content,
                 timestamp=datetime.now(),
+                uid=uuid.uuid4().hex,
+                language=detected_language,
             )
-            Message.create(db, msg)
+            # Write-behind: queued for a batched insert, broadcast does not wait for the commit
+            await message_writer.submit(msg)
 
             await manager.broadcast(room, {
                 **json.loads(msg.json()),
@@ -181,27 +694,135 @@ async def websocket_endpoint(websocket: WebSocket, room: str, username: str, db=
             }, sender_ws=websocket)
 
     except WebSocketDisconnect:
-        print(f"❌ {username} disconnected from {room}")
-        manager.disconnect(room, websocket)
+        logger.info("leave username=%s room=%s", username, room)
+        await manager.disconnect(room, websocket)
 
-    except Exception as e:
-        print(f"❌ Unexpected WebSocket error: {e}")
-        manager.disconnect(room, websocket)
+    except Exception:
+        logger.exception("websocket error username=%s room=%s", username, room)
+        await manager.disconnect(room, websocket)
+
+    finally:
+        if stream is not None:
+            await stream.cancel()
 
 # --- Room Message History ---
 @app.get("/history/{room}")
-def get_history(room: str, db=Depends(get_db)):
-    messages = Message.get_by_room(db, room)
-    return JSONResponse([
-        MessageCreate.model_validate(m, from_attributes=True).model_dump(mode="json")
-        for m in messages
-    ])
+async def get_history(
+    room: str,
+    limit: int = Query(HISTORY_PAGE_SIZE, ge=1, le=HISTORY_MAX_PAGE_SIZE),
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    lang: Optional[str] = None,
+):
+    """Page through a room's history, oldest first.
+
+    Each item carries a ``cursor``; pass the first item's cursor as ``before`` to load
+    older messages, or the last item's as ``after`` to load newer ones. With ``lang``
+    the page is served in that language from stored translations, translating only
+    the rows that have none yet.
+    """
+    try:
+        before_key = Message.decode_cursor(before) if before else None
+        after_key = Message.decode_cursor(after) if after else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if lang:
+        return JSONResponse(await translated_history(room, lang, limit, before_key, after_key))
+
+    def stream():
+        # The session lives as long as the stream, not the request handler
+        db = SessionLocal()
+        try:
+            yield "["
+            sep = ""
+            for row in Message.page_by_room(db, room, limit, before=before_key, after=after_key):
+                yield sep + json.dumps(history_item(row))
+                sep = ","
+            yield "]"
+        finally:
+            db.close()
+
+    return StreamingResponse(stream(), media_type="application/json")
+
+def history_item(row, content=None, uid=None):
+    item = {
+        "id": row.id,
+        "uid": uid or row.uid,
+        "username": row.username,
+        "room": row.room,
+        "content": row.content if content is None else content,
+        "timestamp": row.timestamp.isoformat() if row.timestamp else None,
+        "cursor": Message.encode_cursor(row.timestamp, row.id),
+    }
+    if content is not None and content != row.content:
+        item["original_content"] = row.content
+        item["original_language"] = row.language
+    return item
+
+async def translated_history(room, lang, limit, before_key, after_key):
+    def load():
+        db = SessionLocal()
+        try:
+            rows = list(Message.page_by_room(db, room, limit, before=before_key, after=after_key))
+            uids = {row.id: row.uid for row in rows}
+            legacy = [row.id for row in rows if not row.uid]
+            if legacy:
+                uids.update(Message.assign_uids(db, legacy))
+            return rows, uids, MessageTranslation.get_for(db, list(uids.values()), lang)
+        finally:
+            db.close()
+
+    rows, uids, stored = await executors.run_io(load)
+
+    # Translate only rows with neither a stored translation nor a matching source language
+    todo = {}
+    for row in rows:
+        if row.language != lang and uids[row.id] not in stored:
+            todo.setdefault((row.content, row.language or "auto"), []).append(uids[row.id])
+    pending = list(todo)
+    new_rows = []
+    for i in range(0, len(pending), HISTORY_TRANSLATE_BATCH):
+        batch = pending[i:i + HISTORY_TRANSLATE_BATCH]
+        results = await asyncio.gather(*(
+            translate_or_none(content, lang, src_lang=src) for content, src in batch
+        ))
+        for key, translated in zip(batch, results):
+            for uid in todo[key]:
+                if translated is None:
+                    continue  # shown untranslated this time, retried on the next request
+                stored[uid] = translated
+                new_rows.append({"message_uid": uid, "language": lang, "content": translated})
+    await message_writer.submit_translations(new_rows)
+
+    return [
+        # uids[] covers legacy rows that only got their uid during this request
+        history_item(row, stored.get(uids[row.id], row.content), uids[row.id])
+        for row in rows
+    ]
+
+async def history_since(room, uid, lang):
+    """Stored messages after the one with ``uid`` (first page), or None if it is not stored."""
+    def load_key():
+        db = SessionLocal()
+        try:
+            return Message.key_for_uid(db, room, uid)
+        finally:
+            db.close()
+
+    after_key = await executors.run_io(load_key)
+    if after_key is None:
+        return None
+    return await translated_history(room, lang, HISTORY_MAX_PAGE_SIZE, None, after_key)
 
 # --- Room Reset ---
 @app.post("/create-room/{room}")
 def create_room(room: str, db=Depends(get_db)):
-    print(f"[CREATE ROOM] Resetting history for room: {room}")
+    logger.info("room reset room=%s", room)
     Message.delete_by_room(db, room)
+    manager.recent.pop(room, None)
+    for content_hash in StoredFile.delete_by_room(db, room):
+        release_blob(db, content_hash)
     return JSONResponse(
         {"message": f"Room '{room}' created/reset."},
         status_code=status.HTTP_201_CREATED
@@ -212,188 +833,163 @@ def create_room(room: str, db=Depends(get_db)):
 async def voice_translate(
     audio_file: UploadFile = File(...),
     source_lang: str = Form('hi'),
-    target_lang: str = Form('en')
+    target_lang: str = Form('en'),
+    audio_mode: str = Form('base64'),
+    _slot=Depends(voice_slot),
 ):
-    # Save uploaded audio temporarily
-    temp_input_path = f"temp_{uuid.uuid4()}.wav"
-    with open(temp_input_path, "wb") as f:
-        content = await audio_file.read()
-        f.write(content)
-
-    # Speech to text
-    spoken_text = speech_to_text(temp_input_path, language_code=source_lang)
-
-    # Translate text
-    translated_text = vt_translate_text(spoken_text, src_lang=source_lang, target_lang=target_lang)
+    # Decode upload straight to 16 kHz PCM in memory
+    try:
+        samples = await decode_audio(await audio_file.read())
+    except AudioDecodeError as e:
+        return JSONResponse({"error": f"Audio decoding failed: {e}"}, status_code=400)
 
-    # TTS for translated text
-    output_audio_path = f"translated_{uuid.uuid4()}.mp3"
-    speak_text(translated_text, lang=target_lang, filename=output_audio_path)
+    samples = drop_silence(samples)
+    if not len(samples):
+        return JSONResponse({"translated_text": "", "audio_base64": None, "no_speech": True})
 
-    # Encode output audio to base64
-    with open(output_audio_path, "rb") as audio_f:
-        audio_bytes = audio_f.read()
-        audio_base64 = base64.b64encode(audio_bytes).decode('utf-8')
+    # Speech to text
+    with metrics.stage("stt"):
+        spoken_text = await executors.run_stt(speech_to_text, samples, source_lang, "voice_translate")
 
-    # Clean up
-    os.remove(temp_input_path)
-    os.remove(output_audio_path)
+    # Translate text + TTS (shared with /voice_message through the TTS cache)
+    variant = await render_voice_variant(spoken_text, source_lang, target_lang)
+    translated_text = variant["content"]
+    if audio_mode == "url" and variant["audio_digest"]:
+        return JSONResponse({
+            "translated_text": translated_text,
+            "audio_id": variant["audio_digest"],
+            "audio_url": f"/tts/{variant['audio_digest']}",
+        })
+    audio_base64 = base64.b64encode(variant["audio_bytes"]).decode('utf-8') if variant["audio_bytes"] else None
 
     return JSONResponse({
         "translated_text": translated_text,
         "audio_base64": audio_base64
     })
 
+TTS_ID_PATTERN = re.compile(r"[0-9a-f]{64}")
+
+# --- Cached TTS Clips ---
+@app.get("/tts/{audio_id}")
+def get_tts_clip(audio_id: str, request: Request):
+    """Serve a synthesized clip by content hash; immutable, so browsers may cache it forever"""
+    if not TTS_ID_PATTERN.fullmatch(audio_id):
+        raise HTTPException(status_code=404, detail="Audio not found")
+    path = tts_cache.lookup(audio_id)
+    if path is None or not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Audio not found")
+    headers = {
+        "ETag": f'"{audio_id}"',
+        "Cache-Control": "public, max-age=31536000, immutable",
+    }
+    if_none_match = request.headers.get("if-none-match", "")
+    if f'"{audio_id}"' in if_none_match or if_none_match.strip() == "*":
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    # FileResponse handles Range / If-Range and streams from disk
+    return FileResponse(path, media_type="audio/mpeg", headers=headers)
+
+async def publish_voice(room, username, preferred_language, spoken_text, extra=None):
+    """Translate + synthesize a transcript once per language listening anywhere in the room, then publish it."""
+    # Detect language (use preferred_language as fallback)
+    detected_language = preferred_language
+    if spoken_text.strip():
+        try:
+            detected_language = await detect_language(spoken_text, prior=preferred_language)
+            logger.debug("voice detected_language=%s", detected_language)
+        except Exception as e:
+            logger.warning("voice detect failed error=%s", e)
+
+    languages = await manager.bus.languages(room)
+    if not languages:
+        logger.debug("voice room=%s has no listeners", room)
+        return
+    logger.debug("voice room=%s languages=%d", room, len(languages))
+
+    variants = await render_voice_variants(spoken_text, detected_language, languages)
+    message = {
+        "username": username,
+        "room": room,
+        "timestamp": datetime.utcnow().isoformat(),
+        "detected_language": detected_language,
+        "original_content": spoken_text,
+        "original_language": detected_language,
+        "uid": uuid.uuid4().hex,
+        **(extra or {}),
+    }
+    # One envelope per language; each node renders it per audio mode for its sockets
+    await asyncio.gather(*(
+        manager.bus.publish(room, user_lang, {
+            "kind": "voice",
+            "message": {**message, "content": variant["content"]},
+            "audio_digest": variant["audio_digest"],
+            "audio": variant["audio_bytes"],
+            "uid": message["uid"],
+        })
+        for user_lang, variant in variants.items()
+    ))
+
 @app.post("/voice_message")
 async def voice_message(
     audio: UploadFile = File(...),
     username: str = Form(...),
     room: str = Form(...),
     preferred_language: str = Form('en'),
+    _slot=Depends(voice_slot),
 ):
-    print("[voice_message] Received request:", username, room, preferred_language)
-    print(f"[voice_message] Uploaded file: filename={audio.filename}, content_type={audio.content_type}")
-    # Read the file content to get its size
     file_content = await audio.read()
-    print(f"[voice_message] Uploaded file size: {len(file_content)} bytes")
-    import uuid
-    import os
-    import base64
-    import tempfile
-    import subprocess
-    from .voice_translator import speech_to_text, translate_text, speak_text
-    from fastapi import WebSocket
-    from datetime import datetime
-
-    # Save uploaded audio with original extension
-    orig_ext = os.path.splitext(audio.filename)[-1].lower() or '.webm'
-    temp_dir = tempfile.gettempdir()
-    temp_input_path = os.path.join(temp_dir, f"input_{uuid.uuid4()}{orig_ext}")
-    try:
-        with open(temp_input_path, "wb") as f:
-            f.write(file_content)
-        print(f"[voice_message] Audio saved to {temp_input_path}")
-        print(f"[voice_message] Saved file size: {os.path.getsize(temp_input_path)} bytes")
-    except Exception as e:
-        print(f"[voice_message] Failed to save audio: {e}")
-        return JSONResponse({"error": f"Failed to save audio: {e}"}, status_code=500)
+    logger.debug(
+        "voice_message username=%s room=%s lang=%s filename=%s content_type=%s bytes=%d",
+        username, room, preferred_language, audio.filename, audio.content_type, len(file_content),
+    )
 
-    # Always convert to wav using ffmpeg
-    temp_wav_path = os.path.join(temp_dir, f"converted_{uuid.uuid4()}.wav")
+    # Decode through ffmpeg pipes into a float32 array (no temp files)
     try:
-        print(f"[voice_message] Converting {temp_input_path} to {temp_wav_path} using ffmpeg...")
-        result = subprocess.run([
-            'ffmpeg', '-y', '-i', temp_input_path, '-ar', '16000', '-ac', '1', temp_wav_path
-        ], capture_output=True, text=True)
-        if result.returncode != 0:
-            print(f"[voice_message] ffmpeg error: {result.stderr}")
-            os.remove(temp_input_path)
-            return JSONResponse({"error": f"ffmpeg conversion failed: {result.stderr}"}, status_code=500)
-        print(f"[voice_message] Conversion successful: {temp_wav_path}")
-    except Exception as e:
-        print(f"[voice_message] ffmpeg exception: {e}")
-        os.remove(temp_input_path)
-        return JSONResponse({"error": f"ffmpeg exception: {e}"}, status_code=500)
+        samples = await decode_audio(file_content)
+        logger.debug("voice_message decoded_seconds=%.2f", len(samples) / SAMPLE_RATE)
+    except AudioDecodeError as e:
+        logger.warning("voice_message ffmpeg failed error=%s", e)
+        return JSONResponse({"error": f"ffmpeg conversion failed: {e}"}, status_code=500)
+
+    samples = drop_silence(samples)
+    if not len(samples):
+        logger.debug("voice_message room=%s rejected: no speech", room)
+        return JSONResponse({"status": "no_speech"})
 
     # Speech to text
     try:
-        spoken_text = speech_to_text(temp_wav_path, language_code=preferred_language)
-        print(f"[voice_message] STT result: {spoken_text}")
+        with metrics.stage("stt"):
+            spoken_text = await executors.run_stt(speech_to_text, samples, preferred_language, "voice_message")
+        logger.debug("voice_message transcript=%r", spoken_text)
     except Exception as e:
-        print(f"[voice_message] Speech-to-text failed: {e}")
-        if os.path.exists(temp_input_path): os.remove(temp_input_path)
-        if os.path.exists(temp_wav_path): os.remove(temp_wav_path)
+        logger.exception("voice_message stt failed")
         return JSONResponse({"error": f"Speech-to-text failed: {e}"}, status_code=500)
 
-    # Detect language (use preferred_language as fallback)
-    detected_language = preferred_language
-    if spoken_text.strip():
-        try:
-            from .main import detect_language
-            detected_language = await detect_language(spoken_text)
-            print(f"[voice_message] Detected language: {detected_language}")
-        except Exception as e:
-            print(f"[voice_message] Language detection failed: {e}")
-            pass
-
-    # For each user in the room, send translated message and audio
-    if room in manager.active_connections:
-        for ws in manager.active_connections[room]:
-            user_info = manager.user_info.get(ws, {})
-            user_lang = user_info.get("preferred_language", "en")
-            print(f"[voice_message] Preparing message for user {user_info.get('username')} (lang: {user_lang})")
-            # Translate if needed
-            if user_lang != detected_language:
-                try:
-                    translated_text = translate_text(spoken_text, src_lang=detected_language, target_lang=user_lang)
-                    print(f"[voice_message] Translated text: {translated_text}")
-                except Exception as e:
-                    print(f"[voice_message] Translation failed: {e}")
-                    translated_text = spoken_text
-            else:
-                translated_text = spoken_text
-            # TTS for translated text
-            temp_output_path = os.path.join(temp_dir, f"tts_{uuid.uuid4()}.mp3")
-            try:
-                speak_text(translated_text, lang=user_lang, filename=temp_output_path)
-                print(f"[voice_message] TTS audio saved to {temp_output_path}")
-                with open(temp_output_path, "rb") as audio_f:
-                    audio_bytes = audio_f.read()
-                    audio_base64 = base64.b64encode(audio_bytes).decode('utf-8')
-            except Exception as e:
-                print(f"[voice_message] TTS failed: {e}")
-                audio_base64 = None
-            finally:
-                if os.path.exists(temp_output_path):
-                    os.remove(temp_output_path)
-            # Send via WebSocket
-            msg = {
-                "username": username,
-                "room": room,
-                "content": translated_text,
-                "audio_base64": audio_base64,
-                "timestamp": datetime.utcnow().isoformat(),
-                "detected_language": detected_language,
-                "original_content": spoken_text,
-                "original_language": detected_language
-            }
-            try:
-                await ws.send_json(msg)
-                print(f"[voice_message] Sent message to {user_info.get('username')}")
-            except Exception as e:
-                print(f"[voice_message] Error sending to user {user_info.get('username')}: {e}")
-    else:
-        print(f"[voice_message] No active connections in room {room}")
-    # Clean up
-    if os.path.exists(temp_input_path):
-        os.remove(temp_input_path)
-    if os.path.exists(temp_wav_path):
-        os.remove(temp_wav_path)
-    print("[voice_message] Done.")
+    await publish_voice(room, username, preferred_language, spoken_text)
     return JSONResponse({"status": "ok"})
 
 # --- File Upload Endpoint ---
 @app.post('/upload_file')
-async def upload_file(file: UploadFile = File(...), room: str = Form(...), username: str = Form(...)):
+async def upload_file(file: UploadFile = File(...), room: str = Form(...), username: str = Form(...), db=Depends(get_db)):
+    if file.size is not None and file.size > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail=f"File exceeds {MAX_UPLOAD_BYTES} bytes")
     ext = os.path.splitext(file.filename)[-1]
     file_id = f"{uuid.uuid4().hex}{ext}"
-    save_path = os.path.join(UPLOAD_DIR, file_id)
     file.file.seek(0)  # Reset pointer to start for repeated uploads
-    with open(save_path, 'wb') as f:
-        shutil.copyfileobj(file.file, f)
-    # Store mapping of file_id to original filename
-    mapping_path = os.path.join(UPLOAD_DIR, 'file_map.json')
+    # Stream in chunks with an incremental SHA-256; identical content is stored once
     try:
-        with open(mapping_path, 'r') as m:
-            file_map = json.load(m)
-    except Exception:
-        file_map = {}
-    file_map[file_id] = file.filename
-    with open(mapping_path, 'w') as m:
-        json.dump(file_map, m)
+        tmp_path, content_hash, size = await executors.run_io(stream_to_temp, file.file, MAX_UPLOAD_BYTES)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    mime_type = file.content_type or mimetypes.guess_type(file.filename)[0] or 'application/octet-stream'
+
+    def save():
+        # One thread for both, so the request session is never used from two threads
+        store_blob(db, tmp_path, content_hash, size)
+        StoredFile.create(db, file_id, file.filename, room, username, size, content_hash, mime_type)
 
-    # Build file URL (relative to static mount)
-    file_url = f"/static/uploads/{file_id}"
+    await executors.run_io(save)
+
+    file_url = f"/download_file/{file_id}"
 
     # Notify all users in the room via WebSocket
     msg = {
@@ -404,6 +1000,7 @@ async def upload_file(file: UploadFile = File(...), room: str = Form(...), usern
         "file_id": file_id,
         "file_url": file_url,
         "timestamp": datetime.utcnow().isoformat(),
+        "uid": uuid.uuid4().hex,
     }
     await manager.broadcast(room, msg)
 
@@ -415,20 +1012,87 @@ async def upload_file(file: UploadFile = File(...), room: str = Form(...), usern
 
 # --- File Download Endpoint ---
 @app.get('/download_file/{file_id}')
-async def download_file(file_id: str):
-    file_path = os.path.join(UPLOAD_DIR, file_id)
-    if not os.path.exists(file_path):
+def download_file(file_id: str, db=Depends(get_db)):
+    # Plain def: FastAPI runs it in its threadpool, so the lookup never blocks the loop
+    # Original filename and content hash from the files table (primary-key lookup)
+    record = StoredFile.get(db, file_id)
+    file_path = resolve_path(file_id, record.content_hash if record else None)
+    if file_path is None:
         raise HTTPException(status_code=404, detail="File not found")
-    # Get original filename from mapping
-    mapping_path = os.path.join(UPLOAD_DIR, 'file_map.json')
-    try:
-        with open(mapping_path, 'r') as m:
-            file_map = json.load(m)
-        filename = file_map.get(file_id, file_id)
-    except Exception:
-        filename = file_id
+    filename = record.original_name if record and record.original_name else file_id
+    # FileResponse streams from disk (sendfile via the pathsend extension where the
+    # server supports it) and answers Range requests
     return FileResponse(file_path, filename=filename, media_type='application/octet-stream')
 
+@app.get('/voice/models')
+async def voice_models():
+    """Report configured Whisper sizes, load times and resident memory (from an STT worker)"""
+    if not ENABLE_VOICE:
+        raise HTTPException(status_code=503, detail="Voice is disabled on this worker")
+    return await executors.stt_stats()
+
+@app.get('/ready')
+def readiness():
+    """Readiness probe: 503 while a voice worker is still loading Whisper"""
+    ready = not ENABLE_VOICE or VOICE_PREWARM == "off" or executors.stt_state == "ready"
+    body = {"ready": ready, "voice": executors.stt_state if ENABLE_VOICE else "disabled"}
+    return JSONResponse(body, status_code=200 if ready else 503)
+
+@app.get('/voice/admission')
+def voice_admission_stats():
+    """Report in-flight and queued voice requests"""
+    return voice_admission.stats()
+
+@app.get('/voice/tts_cache')
+def tts_cache_stats():
+    """Report TTS clip cache size and hit/miss counters"""
+    return tts_cache.stats()
+
+@app.get('/connections')
+def connection_stats():
+    """Report per-socket send queue depths and drops on this node"""
+    return {"rooms": manager.bus.local_rooms(), **manager.queue_stats()}
+
+@app.get('/persistence')
+def persistence_stats():
+    """Report write-behind queue depth and write counters"""
+    return message_writer.stats()
+
+@app.get('/translation/cache')
+def translation_cache_stats():
+    """Report translation cache size and hit/miss counters, plus the request batcher"""
+    return {**translation_cache.stats(), "batcher": translation_batcher.stats()}
+
+# --- Metrics ---
+# Components keep their own counters; these read them at scrape time
+metrics.counter("translingo_translation_cache_hits_total", "Translation cache hits",
+                lambda: translation_cache.stats()["hits"])
+metrics.counter("translingo_translation_cache_misses_total", "Translation cache misses",
+                lambda: translation_cache.stats()["misses"])
+metrics.gauge("translingo_translate_waiting", "Distinct translations queued or in flight in the batcher",
+              lambda: translation_batcher.stats()["waiting"])
+metrics.counter("translingo_tts_cache_hits_total", "TTS clip cache hits", lambda: tts_cache.stats()["hits"])
+metrics.counter("translingo_tts_cache_misses_total", "TTS clip cache misses", lambda: tts_cache.stats()["misses"])
+metrics.gauge("translingo_tts_cache_bytes", "Bytes of cached TTS clips", lambda: tts_cache.total_bytes)
+metrics.gauge("translingo_persistence_pending", "Messages queued for the DB writer", lambda: message_writer.pending)
+metrics.counter("translingo_persistence_failed_total", "Queued writes dropped after retries",
+                lambda: message_writer.failed)
+metrics.gauge("translingo_voice_inflight", "Voice requests being processed", lambda: voice_admission.inflight)
+metrics.gauge("translingo_voice_waiting", "Voice requests waiting for a slot", lambda: voice_admission.waiting)
+metrics.counter("translingo_voice_rejected_total", "Voice requests rejected with 503",
+                lambda: voice_admission.rejected)
+metrics.counter("translingo_voice_partials_skipped_total", "Streaming partial decodes skipped for lack of a voice slot",
+                lambda: voice_admission.skipped)
+metrics.gauge("translingo_ws_connections", "Open WebSockets on this node", lambda: len(manager.senders))
+metrics.gauge("translingo_rooms", "Rooms with listeners on this node", lambda: len(manager.active_connections))
+metrics.gauge("translingo_ws_send_queue_depth", "Payloads queued across all send queues",
+              lambda: manager.queue_stats()["total_depth"])
+
+@app.get('/metrics')
+def prometheus_metrics():
+    """Prometheus scrape endpoint (text exposition format)"""
+    return Response(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
 @app.get('/supported_languages')
 def supported_languages():
     """Return all supported languages as a dict: {code: name}"""
@@ -0,0 +1,179 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Minimal Prometheus text-format instrumentation (no client library needed).
+# Metrics are recorded from the event loop and from executor threads, so every
+# update takes the metric's lock.
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_str(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+class _Metric:
+    """Values are set directly, or computed at scrape time by ``fn`` (a number or {label tuple: number})."""
+
+    kind = ""
+
+    def __init__(self, name, help_text, labels=(), fn=None):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+        self._fn = fn
+
+    def _key(self, labels):
+        return tuple(labels.get(name, "") for name in self.labels)
+
+    def _samples(self):
+        if self._fn is not None:
+            try:
+                value = self._fn()
+            except Exception:
+                return []
+            items = value.items() if isinstance(value, dict) else [((), value)]
+        else:
+            with self._lock:
+                items = list(self._values.items())
+        return [f"{self.name}{_label_str(self.labels, key)} {value}" for key, value in items]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))  # _values: key -> [bucket counts..., sum, count]
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * (len(self.buckets) + 2)
+            if idx < len(self.buckets):
+                state[idx] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _samples(self):
+        with self._lock:
+            items = [(key, list(state)) for key, state in self._values.items()]
+        lines = []
+        for key, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_label_str(self.labels + ('le',), key + (bound,))} {cumulative}")
+            lines.append(f"{self.name}_bucket{_label_str(self.labels + ('le',), key + ('+Inf',))} {state[-1]}")
+            lines.append(f"{self.name}_sum{_label_str(self.labels, key)} {state[-2]}")
+            lines.append(f"{self.name}_count{_label_str(self.labels, key)} {state[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+STAGE_SECONDS = registry.register(Histogram(
+    "translingo_stage_seconds", "Latency of pipeline stages", labels=("stage",)))
+STAGE_ERRORS = registry.register(Counter(
+    "translingo_stage_errors_total", "Failures per pipeline stage", labels=("stage",)))
+MESSAGES_SENT = registry.register(Counter(
+    "translingo_ws_messages_sent_total", "Payloads written to WebSockets"))
+BYTES_SENT = registry.register(Counter(
+    "translingo_ws_bytes_sent_total", "Bytes written to WebSockets", labels=("frame",)))
+MESSAGES_DROPPED = registry.register(Counter(
+    "translingo_ws_messages_dropped_total", "Payloads dropped or coalesced by send-queue overflow"))
+EVICTIONS = registry.register(Counter(
+    "translingo_ws_evictions_total", "Sockets evicted as dead or slow consumers"))
+VOICE_AUDIO_SECONDS = registry.register(Counter(
+    "translingo_voice_audio_seconds_total", "Voice audio decoded vs. sent to Whisper after VAD", labels=("kind",)))
+VOICE_NO_SPEECH = registry.register(Counter(
+    "translingo_voice_no_speech_total", "Voice uploads rejected by VAD as silent"))
+LANG_DETECTIONS = registry.register(Counter(
+    "translingo_lang_detections_total", "Language detections by where they were answered", labels=("source",)))
+TRANSLATE_REQUESTS = registry.register(Counter(
+    "translingo_translate_requests_total", "Batched translation requests by how they were answered",
+    labels=("outcome",)))
+TRANSLATE_BATCH_TEXTS = registry.register(Histogram(
+    "translingo_translate_batch_texts", "Distinct texts per translation batch",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128)))
+
+
+@contextmanager
+def stage(name):
+    """Time a pipeline stage and count its failures."""
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        STAGE_ERRORS.inc(stage=name)
+        raise
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage=name)
+
+
+def gauge(name, help_text, fn, labels=()):
+    """Register a gauge evaluated at scrape time."""
+    return registry.register(Gauge(name, help_text, labels=labels, fn=fn))
+
+
+def counter(name, help_text, fn, labels=()):
+    """Register a counter whose running total is kept elsewhere (e.g. cache stats)."""
+    return registry.register(Counter(name, help_text, labels=labels, fn=fn))
@@ -0,0 +1,142 @@
+import logging
+import os
+import threading
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Default Whisper size plus optional overrides, e.g.
+#   WHISPER_MODEL=base
+#   WHISPER_MODEL_BY_LANGUAGE=hi:small,en:base
+#   WHISPER_MODEL_BY_ENDPOINT=voice_message:base,voice_translate:small
+#   WHISPER_PRELOAD=base,small
+# Clips with at most WHISPER_SHORT_CLIP_SECONDS of speech (after VAD) can use a
+# smaller model, e.g. WHISPER_SHORT_CLIP_MODEL=tiny (unset: no short-clip routing)
+DEFAULT_MODEL_SIZE = os.getenv("WHISPER_MODEL", "base")
+WHISPER_SHORT_CLIP_MODEL = os.getenv("WHISPER_SHORT_CLIP_MODEL", "").strip() or None
+WHISPER_SHORT_CLIP_SECONDS = float(os.getenv("WHISPER_SHORT_CLIP_SECONDS", "4"))
+WHISPER_DEVICE = os.getenv("WHISPER_DEVICE") or None
+
+
+def _parse_mapping(value):
+    mapping = {}
+    for item in (value or "").split(","):
+        if ":" not in item:
+            continue
+        key, size = item.split(":", 1)
+        if key.strip() and size.strip():
+            mapping[key.strip()] = size.strip()
+    return mapping
+
+
+def _current_rss():
+    """Resident set size of this process in bytes (Linux), or None."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class WhisperModelRegistry:
+    """Loads each Whisper size once per process and shares it across requests."""
+
+    def __init__(self, default_size=DEFAULT_MODEL_SIZE, by_language=None, by_endpoint=None, device=WHISPER_DEVICE,
+                 short_clip_size=WHISPER_SHORT_CLIP_MODEL, short_clip_seconds=WHISPER_SHORT_CLIP_SECONDS):
+        self.default_size = default_size
+        self.by_language = by_language or {}
+        self.by_endpoint = by_endpoint or {}
+        self.short_clip_size = short_clip_size
+        self.short_clip_seconds = short_clip_seconds
+        self.device = device
+        self._models = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._size_locks = {}
+
+    def resolve(self, language=None, endpoint=None, size=None, duration=None):
+        """Pick a model size: explicit > short clip > per-endpoint > per-language > default."""
+        if size:
+            return size
+        if self.short_clip_size and duration is not None and duration <= self.short_clip_seconds:
+            return self.short_clip_size
+        if endpoint and endpoint in self.by_endpoint:
+            return self.by_endpoint[endpoint]
+        if language and language in self.by_language:
+            return self.by_language[language]
+        return self.default_size
+
+    def get(self, language=None, endpoint=None, size=None, duration=None):
+        size = self.resolve(language=language, endpoint=endpoint, size=size, duration=duration)
+        model = self._models.get(size)
+        if model is not None:
+            return model
+
+        with self._lock:
+            size_lock = self._size_locks.setdefault(size, threading.Lock())
+        # Concurrent first requests for the same size wait for a single load.
+        with size_lock:
+            model = self._models.get(size)
+            if model is None:
+                model = self._load(size)
+        return model
+
+    def _load(self, size):
+        import whisper
+
+        rss_before = _current_rss()
+        started = time.perf_counter()
+        model = whisper.load_model(size, device=self.device)
+        load_seconds = time.perf_counter() - started
+        rss_after = _current_rss()
+
+        param_bytes = sum(p.numel() * p.element_size() for p in model.parameters())
+        self._stats[size] = {
+            "load_seconds": round(load_seconds, 3),
+            "parameter_bytes": param_bytes,
+            "rss_delta_bytes": (rss_after - rss_before) if rss_before is not None and rss_after is not None else None,
+            "device": str(model.device),
+            "loaded_at": time.time(),
+        }
+        self._models[size] = model
+        logger.info("whisper loaded size=%s seconds=%.2f weights_mb=%.0f", size, load_seconds, param_bytes / 1e6)
+        return model
+
+    def configured_sizes(self):
+        sizes = {self.default_size, *self.by_language.values(), *self.by_endpoint.values()}
+        if self.short_clip_size:
+            sizes.add(self.short_clip_size)
+        return sorted(sizes)
+
+    def warm(self, sizes=None):
+        """Load the given sizes (default: every configured size) up front."""
+        for size in (self.configured_sizes() if sizes is None else sizes):
+            self.get(size=size)
+
+    def stats(self):
+        return {
+            "default": self.default_size,
+            "by_language": dict(self.by_language),
+            "by_endpoint": dict(self.by_endpoint),
+            "short_clip": {"size": self.short_clip_size, "max_seconds": self.short_clip_seconds},
+            "loaded": {size: dict(info) for size, info in self._stats.items()},
+            "process_rss_bytes": _current_rss(),
+        }
+
+
+registry = WhisperModelRegistry(
+    by_language=_parse_mapping(os.getenv("WHISPER_MODEL_BY_LANGUAGE")),
+    by_endpoint=_parse_mapping(os.getenv("WHISPER_MODEL_BY_ENDPOINT")),
+)
+
+
+def preload_sizes():
+    """Sizes to warm at startup from WHISPER_PRELOAD ("" disables, "all" = every configured size)."""
+    value = os.getenv("WHISPER_PRELOAD", "all").strip()
+    if value == "all":
+        return registry.configured_sizes()
+    return [s.strip() for s in value.split(",") if s.strip()]
@@ -1,7 +1,15 @@
-from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Index, and_, or_, insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import declarative_base
 from .schemas import MessageCreate
-from typing import List
+from typing import List, Optional
+from datetime import datetime
+import base64
+import hashlib
+import json
+import mimetypes
+import os
+import uuid
 
 Base = declarative_base()
 
@@ -12,6 +20,45 @@ class MessageORM(Base):
     room = Column(String, index=True)
     content = Column(String)
     timestamp = Column(DateTime)
+    uid = Column(String(32), unique=True, index=True)
+    language = Column(String(16))
+
+    # Keyset pagination walks (room, timestamp, id) in index order
+    __table_args__ = (
+        Index("ix_messages_room_timestamp_id", "room", "timestamp", "id"),
+    )
+
+class MessageTranslationORM(Base):
+    """Translations produced by broadcast (or history backfill), one row per message and language."""
+    __tablename__ = "message_translations"
+    id = Column(Integer, primary_key=True)
+    message_uid = Column(String(32), nullable=False)
+    language = Column(String(16), nullable=False)
+    content = Column(String)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_message_translations_uid_language", "message_uid", "language", unique=True),
+    )
+
+class StoredFileORM(Base):
+    __tablename__ = "files"
+    id = Column(String, primary_key=True)  # public file_id, e.g. "<uuid hex>.pdf"
+    original_name = Column(String)
+    room = Column(String, index=True)
+    uploader = Column(String)
+    size = Column(BigInteger)
+    content_hash = Column(String(64), index=True)
+    mime_type = Column(String)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class BlobORM(Base):
+    """One row per distinct upload content; ref_count tracks files pointing at it."""
+    __tablename__ = "blobs"
+    content_hash = Column(String(64), primary_key=True)
+    size = Column(BigInteger)
+    ref_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
 
 class Message:
     @staticmethod
@@ -27,11 +74,217 @@ class Message:
         db.refresh(db_msg)
         return db_msg
 
+    @staticmethod
+    def create_many(db, msgs: List[MessageCreate], commit: bool = True):
+        """Bulk insert in one round trip (used by the write-behind queue)."""
+        if not msgs:
+            return
+        db.execute(insert(MessageORM), [
+            {"username": m.username, "room": m.room, "content": m.content, "timestamp": m.timestamp,
+             "uid": m.uid, "language": m.language}
+            for m in msgs
+        ])
+        if commit:
+            db.commit()
+
     @staticmethod
     def get_by_room(db, room: str) -> List[MessageCreate]:
         return db.query(MessageORM).filter(MessageORM.room == room).order_by(MessageORM.timestamp).all()
 
+    @staticmethod
+    def page_by_room(db, room: str, limit: int, before=None, after=None):
+        """Keyset page of a room's messages in chronological order.
+
+        ``before``/``after`` are decoded cursors, i.e. (timestamp, id) tuples. Without
+        ``after`` the newest ``limit`` messages (older than ``before``) are returned.
+        Yields (id, username, room, content, timestamp, uid, language) rows straight off the cursor.
+        """
+        columns = (
+            MessageORM.id, MessageORM.username, MessageORM.room, MessageORM.content,
+            MessageORM.timestamp, MessageORM.uid, MessageORM.language,
+        )
+        query = db.query(*columns).filter(MessageORM.room == room)
+        if before is not None:
+            ts, msg_id = before
+            query = query.filter(or_(
+                MessageORM.timestamp < ts,
+                and_(MessageORM.timestamp == ts, MessageORM.id < msg_id),
+            ))
+        if after is not None:
+            ts, msg_id = after
+            query = query.filter(or_(
+                MessageORM.timestamp > ts,
+                and_(MessageORM.timestamp == ts, MessageORM.id > msg_id),
+            ))
+            query = query.order_by(MessageORM.timestamp, MessageORM.id).limit(limit)
+        else:
+            newest = query.order_by(MessageORM.timestamp.desc(), MessageORM.id.desc()).limit(limit).subquery()
+            query = db.query(*newest.c).order_by(newest.c.timestamp, newest.c.id)
+        return query.yield_per(100)
+
+    @staticmethod
+    def key_for_uid(db, room: str, uid: str):
+        """Decoded cursor (timestamp, id) of a message by uid, or None if it is not stored."""
+        row = db.query(MessageORM.timestamp, MessageORM.id).filter(
+            MessageORM.room == room, MessageORM.uid == uid
+        ).first()
+        return (row.timestamp, row.id) if row else None
+
+    @staticmethod
+    def assign_uids(db, ids: List[int]) -> dict:
+        """Give legacy rows (created before uids existed) a uid; returns {id: uid}.
+
+        A concurrent caller may have assigned one first; its uid is read back then,
+        so the result always matches what is stored.
+        """
+        assigned = {}
+        for msg_id in ids:
+            uid = uuid.uuid4().hex
+            updated = db.query(MessageORM).filter(MessageORM.id == msg_id, MessageORM.uid.is_(None)).update(
+                {MessageORM.uid: uid}, synchronize_session=False
+            )
+            if updated:
+                assigned[msg_id] = uid
+        db.commit()
+        lost = [msg_id for msg_id in ids if msg_id not in assigned]
+        if lost:
+            assigned.update(db.query(MessageORM.id, MessageORM.uid).filter(MessageORM.id.in_(lost)).all())
+        return assigned
+
+    @staticmethod
+    def encode_cursor(timestamp: datetime, msg_id: int) -> str:
+        raw = f"{timestamp.isoformat()}|{msg_id}".encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    @staticmethod
+    def decode_cursor(cursor: str):
+        """Inverse of encode_cursor; raises ValueError on malformed input."""
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+            ts, msg_id = raw.rsplit("|", 1)
+            return datetime.fromisoformat(ts), int(msg_id)
+        except Exception as e:
+            raise ValueError(f"Invalid cursor: {cursor}") from e
+
     @staticmethod
     def delete_by_room(db, room: str):
+        # Translations are keyed by message uid only, so delete them through the room's uids
+        uids = db.query(MessageORM.uid).filter(MessageORM.room == room, MessageORM.uid.isnot(None))
+        db.query(MessageTranslationORM).filter(
+            MessageTranslationORM.message_uid.in_(uids.scalar_subquery())
+        ).delete(synchronize_session=False)
         db.query(MessageORM).filter(MessageORM.room == room).delete()
-        db.commit() 
+        db.commit()
+
+class MessageTranslation:
+    @staticmethod
+    def create_many(db, rows: List[dict], commit: bool = True):
+        """Insert {message_uid, language, content} rows, skipping ones already stored."""
+        if not rows:
+            return
+        dialect = db.get_bind().dialect.name
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+            stmt = dialect_insert(MessageTranslationORM).on_conflict_do_nothing()
+        elif dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+            stmt = dialect_insert(MessageTranslationORM).on_conflict_do_nothing()
+        else:
+            stmt = insert(MessageTranslationORM)
+        db.execute(stmt, [{**row, "created_at": datetime.utcnow()} for row in rows])
+        if commit:
+            db.commit()
+
+    @staticmethod
+    def get_for(db, uids: List[str], language: str) -> dict:
+        """Stored translations of the given messages into one language, as {uid: content}."""
+        if not uids:
+            return {}
+        rows = db.query(MessageTranslationORM.message_uid, MessageTranslationORM.content).filter(
+            MessageTranslationORM.language == language,
+            MessageTranslationORM.message_uid.in_(uids),
+        ).all()
+        return {uid: content for uid, content in rows}
+
+class StoredFile:
+    @staticmethod
+    def create(db, file_id: str, original_name: str, room: str, uploader: str,
+               size: int, content_hash: str, mime_type: str) -> StoredFileORM:
+        db_file = StoredFileORM(
+            id=file_id,
+            original_name=original_name,
+            room=room,
+            uploader=uploader,
+            size=size,
+            content_hash=content_hash,
+            mime_type=mime_type,
+            created_at=datetime.utcnow(),
+        )
+        db.add(db_file)
+        db.commit()
+        return db_file
+
+    @staticmethod
+    def get(db, file_id: str) -> Optional[StoredFileORM]:
+        return db.get(StoredFileORM, file_id)
+
+    @staticmethod
+    def delete_by_room(db, room: str) -> List[str]:
+        """Delete a room's file rows; returns their content hashes so blobs can be released."""
+        hashes = [
+            row[0] for row in
+            db.query(StoredFileORM.content_hash).filter(StoredFileORM.room == room).all()
+            if row[0]
+        ]
+        db.query(StoredFileORM).filter(StoredFileORM.room == room).delete()
+        db.commit()
+        return hashes
+
+    @staticmethod
+    def migrate_file_map(db, upload_dir: str) -> int:
+        """One-time import of the legacy static/uploads/file_map.json; returns rows added."""
+        mapping_path = os.path.join(upload_dir, 'file_map.json')
+        if not os.path.exists(mapping_path):
+            return 0
+        with open(mapping_path, 'r') as m:
+            file_map = json.load(m)
+
+        existing = {
+            row[0] for row in
+            db.query(StoredFileORM.id).filter(StoredFileORM.id.in_(list(file_map))).all()
+        } if file_map else set()
+        added = 0
+        for file_id, original_name in file_map.items():
+            if file_id in existing:
+                continue
+            path = os.path.join(upload_dir, file_id)
+            size, content_hash, created_at = None, None, datetime.utcnow()
+            if os.path.exists(path):
+                digest = hashlib.sha256()
+                with open(path, 'rb') as f:
+                    for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                        digest.update(chunk)
+                size = os.path.getsize(path)
+                content_hash = digest.hexdigest()
+                created_at = datetime.utcfromtimestamp(os.path.getmtime(path))
+            db.add(StoredFileORM(
+                id=file_id,
+                original_name=original_name,
+                size=size,
+                content_hash=content_hash,
+                mime_type=mimetypes.guess_type(original_name)[0] or 'application/octet-stream',
+                created_at=created_at,
+            ))
+            added += 1
+        try:
+            db.commit()
+        except IntegrityError:
+            # Another worker migrated the same map concurrently
+            db.rollback()
+            added = 0
+        # Keep the old map around for reference, but never read it again
+        try:
+            os.replace(mapping_path, mapping_path + '.migrated')
+        except FileNotFoundError:
+            pass
+        return added
@@ -0,0 +1,161 @@
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+from . import metrics
+from .db import SessionLocal
+from .models import Message, MessageTranslation
+from .schemas import MessageCreate
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# MESSAGE_DURABILITY: "async" (write-behind, broadcast never waits for the DB)
+#                     or "sync" (sender waits until its batch is committed)
+# MESSAGE_BATCH_SIZE / MESSAGE_FLUSH_MS: flush every N messages or T milliseconds
+# MESSAGE_MAX_PENDING: queued messages before senders are back-pressured
+MESSAGE_DURABILITY = os.getenv("MESSAGE_DURABILITY", "async")
+MESSAGE_BATCH_SIZE = int(os.getenv("MESSAGE_BATCH_SIZE", "100"))
+MESSAGE_FLUSH_MS = int(os.getenv("MESSAGE_FLUSH_MS", "50"))
+MESSAGE_MAX_PENDING = int(os.getenv("MESSAGE_MAX_PENDING", "10000"))
+WRITE_RETRIES = 3
+
+_STOP = object()
+
+
+class MessageWriter:
+    """Write-behind queue that bulk-inserts chat messages (and their translations) off the event loop."""
+
+    def __init__(self, batch_size=MESSAGE_BATCH_SIZE, flush_ms=MESSAGE_FLUSH_MS,
+                 max_pending=MESSAGE_MAX_PENDING, durability=MESSAGE_DURABILITY):
+        self.batch_size = batch_size
+        self.flush_interval = flush_ms / 1000
+        self.max_pending = max_pending
+        self.durability = durability
+        self._queue = None
+        self._task = None
+        # A single writer thread keeps inserts in submission order
+        self._db_thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix="translingo-db")
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+
+    @property
+    def pending(self):
+        return self._queue.qsize() if self._queue else 0
+
+    async def start(self):
+        if self._task is None:
+            self._queue = asyncio.Queue(maxsize=self.max_pending)
+            self._task = asyncio.create_task(self._run())
+
+    async def submit(self, msg: MessageCreate):
+        """Queue a message; waits for the commit only in "sync" durability mode."""
+        if self._task is None:
+            # Writer not running (e.g. scripts/tests): fall back to a direct write
+            await asyncio.get_running_loop().run_in_executor(self._db_thread, self._write, [("message", msg)])
+            return
+        done = asyncio.get_running_loop().create_future() if self.durability == "sync" else None
+        await self._queue.put(("message", msg, done))
+        if done is not None:
+            await done
+
+    async def submit_translations(self, rows):
+        """Queue {message_uid, language, content} rows; never waits for the commit."""
+        if not rows:
+            return
+        if self._task is None:
+            await asyncio.get_running_loop().run_in_executor(self._db_thread, self._write, [("translations", rows)])
+            return
+        await self._queue.put(("translations", rows, None))
+
+    async def _run(self):
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._flush(batch)
+
+    async def _flush(self, batch):
+        loop = asyncio.get_running_loop()
+        error = None
+        for attempt in range(WRITE_RETRIES):
+            try:
+                with metrics.stage("db_write"):
+                    await loop.run_in_executor(self._db_thread, self._write, [(kind, payload) for kind, payload, _ in batch])
+                error = None
+                break
+            except Exception as e:
+                error = e
+                await asyncio.sleep(0.1 * 2 ** attempt)
+        if error is None:
+            self.written += len(batch)
+            self.batches += 1
+        else:
+            self.failed += len(batch)
+            logger.error("persistence dropped=%d retries=%d error=%s", len(batch), WRITE_RETRIES, error)
+        for _, _, done in batch:
+            if done is not None and not done.done():
+                if error is None:
+                    done.set_result(None)
+                else:
+                    done.set_exception(error)
+
+    @staticmethod
+    def _write(items):
+        messages = [payload for kind, payload in items if kind == "message"]
+        translations = [row for kind, payload in items if kind == "translations" for row in payload]
+        db = SessionLocal()
+        try:
+            # One transaction: a failed translation insert must not leave the messages
+            # committed, or every retry would trip over their unique uids
+            Message.create_many(db, messages, commit=False)
+            MessageTranslation.create_many(db, translations, commit=False)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    async def stop(self):
+        """Flush everything still queued, then stop the writer."""
+        if self._task is None:
+            return
+        # Everything queued before the sentinel is flushed in order
+        await self._queue.put(_STOP)
+        await self._task
+        self._task = None
+
+    def stats(self):
+        return {
+            "durability": self.durability,
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "written": self.written,
+            "failed": self.failed,
+            "batches": self.batches,
+        }
+
+
+message_writer = MessageWriter()
@@ -0,0 +1,54 @@
+import os
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# ROOM_BUFFER_SIZE: recent messages kept in memory per room for resume-on-reconnect
+ROOM_BUFFER_SIZE = int(os.getenv("ROOM_BUFFER_SIZE", "200"))
+
+# (message uid, {language: envelope as delivered}); language None = same for everyone
+Entry = Tuple[Optional[str], Dict[Optional[str], dict]]
+
+
+class RoomBuffer:
+    """Bounded ring of a room's recent messages, each kept per language as delivered.
+
+    Only complete while this node has listeners in the room: the manager drops
+    the buffer when the room empties, so a stale buffer never hides a gap.
+    """
+
+    def __init__(self, size: int = ROOM_BUFFER_SIZE):
+        self.size = size
+        self._entries = deque()
+        self._by_uid = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, uid: Optional[str], lang: Optional[str], envelope: dict):
+        entry = self._by_uid.get(uid) if uid else None
+        if entry is None:
+            entry = (uid, {})
+            self._entries.append(entry)
+            if uid:
+                self._by_uid[uid] = entry
+            if len(self._entries) > self.size:
+                old_uid, _ = self._entries.popleft()
+                self._by_uid.pop(old_uid, None)
+        entry[1][lang] = envelope
+
+    def since(self, uid: str) -> Optional[List[Entry]]:
+        """Entries newer than ``uid``, or None when it is no longer (or never was) buffered."""
+        anchor = self._by_uid.get(uid)
+        if anchor is None:
+            return None
+        missed = []
+        for entry in reversed(self._entries):
+            if entry is anchor:
+                break
+            missed.append(entry)
+        missed.reverse()
+        return missed
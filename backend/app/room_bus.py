@@ -0,0 +1,277 @@
+import asyncio
+import base64
+import json
+import logging
+import os
+import uuid
+from abc import ABC, abstractmethod
+from collections import Counter
+from typing import Awaitable, Callable, Dict, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# ROOM_BUS: "memory" (single process, default) or "redis" (any Redis-protocol server)
+# REDIS_URL: e.g. redis://localhost:6379/0
+# ROOM_BUS_PREFIX: key/channel namespace shared by every node of one deployment
+# ROOM_BUS_PRESENCE_TTL: seconds before a silent node's presence expires
+# ROOM_BUS_RECONNECT_MAX: longest wait (seconds) between attempts to resubscribe after Redis drops
+ROOM_BUS = os.getenv("ROOM_BUS", "memory")
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+ROOM_BUS_PREFIX = os.getenv("ROOM_BUS_PREFIX", "translingo")
+ROOM_BUS_PRESENCE_TTL = int(os.getenv("ROOM_BUS_PRESENCE_TTL", "30"))
+ROOM_BUS_RECONNECT_MAX = float(os.getenv("ROOM_BUS_RECONNECT_MAX", "30"))
+
+# deliver(room, lang, envelope): lang None means "every listener in the room"
+Deliver = Callable[[str, Optional[str], dict], Awaitable[None]]
+
+
+class RoomBus(ABC):
+    """Routes room messages to every node that has listeners in that room.
+
+    Publishers send one envelope per (room, language); each node fans it out to its
+    own sockets. Presence tracks which languages are listening cluster-wide so the
+    publisher knows which translations to produce.
+    """
+
+    def __init__(self):
+        self.node_id = uuid.uuid4().hex[:12]
+        self._deliver: Optional[Deliver] = None
+        self._local = {}  # room -> Counter(lang -> local listeners)
+
+    async def start(self, deliver: Deliver):
+        self._deliver = deliver
+
+    async def stop(self):
+        pass
+
+    @abstractmethod
+    async def publish(self, room: str, lang: Optional[str], envelope: dict):
+        """Send one envelope to every node with listeners in ``room``."""
+
+    async def join(self, room: str, lang: str):
+        self._local.setdefault(room, Counter())[lang] += 1
+
+    async def leave(self, room: str, lang: str):
+        counts = self._local.get(room)
+        if counts is None:
+            return
+        counts[lang] -= 1
+        if counts[lang] <= 0:
+            del counts[lang]
+        if not counts:
+            del self._local[room]
+
+    async def presence(self, room: str) -> Dict[str, int]:
+        """Listener count per language across all nodes."""
+        return dict(self._local.get(room, {}))
+
+    async def languages(self, room: str):
+        return set(await self.presence(room))
+
+    def local_rooms(self):
+        return {room: dict(counts) for room, counts in self._local.items()}
+
+
+class InProcessRoomBus(RoomBus):
+    """Single-process bus: publishing is a direct call into the local fan-out."""
+
+    async def publish(self, room: str, lang: Optional[str], envelope: dict):
+        await self._deliver(room, lang, envelope)
+
+
+def _encode(envelope: dict) -> str:
+    # Audio travels as bytes in-process; JSON needs it base64-wrapped
+    return json.dumps({
+        key: {"__b64__": base64.b64encode(value).decode()} if isinstance(value, bytes) else value
+        for key, value in envelope.items()
+    })
+
+
+def _decode(data) -> dict:
+    return {
+        key: base64.b64decode(value["__b64__"]) if isinstance(value, dict) and "__b64__" in value else value
+        for key, value in json.loads(data).items()
+    }
+
+
+class RedisRoomBus(RoomBus):
+    """Cross-worker / cross-node bus over Redis pub/sub.
+
+    ``client`` may be any redis.asyncio-compatible client, so a local stand-in
+    (e.g. fakeredis) can replace a real server.
+    """
+
+    def __init__(self, url: str = REDIS_URL, prefix: str = ROOM_BUS_PREFIX,
+                 presence_ttl: int = ROOM_BUS_PRESENCE_TTL, client=None):
+        super().__init__()
+        self.url = url
+        self.prefix = prefix
+        self.presence_ttl = presence_ttl
+        self._client = client
+        self._pubsub = None
+        self._tasks = []
+
+    def _channel(self, room: str) -> str:
+        return f"{self.prefix}:room:{room}"
+
+    def _presence_key(self, room: str, node_id: str) -> str:
+        return f"{self.prefix}:presence:{room}:{node_id}"
+
+    def _nodes_key(self, room: str) -> str:
+        return f"{self.prefix}:nodes:{room}"
+
+    async def start(self, deliver: Deliver):
+        await super().start(deliver)
+        if self._client is None:
+            try:
+                import redis.asyncio as redis
+            except ImportError as e:
+                raise RuntimeError("ROOM_BUS=redis requires the 'redis' package") from e
+            self._client = redis.from_url(self.url)
+        # Subscribed before returning, so nothing published right after startup is missed
+        await self._subscribe()
+        self._tasks = [
+            asyncio.create_task(self._listen()),
+            asyncio.create_task(self._heartbeat()),
+        ]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        for room in list(self._local):
+            await self._client.delete(self._presence_key(room, self.node_id))
+            await self._client.srem(self._nodes_key(room), self.node_id)
+        await self._close_pubsub()
+
+    async def _subscribe(self):
+        self._pubsub = self._client.pubsub()
+        await self._pubsub.psubscribe(self._channel("*"))
+
+    async def _close_pubsub(self):
+        pubsub, self._pubsub = self._pubsub, None
+        if pubsub is None:
+            return
+        try:
+            await pubsub.punsubscribe()
+        except Exception:
+            pass  # the connection is usually what failed
+        try:
+            await pubsub.close()
+        except Exception:
+            pass
+
+    async def publish(self, room: str, lang: Optional[str], envelope: dict):
+        await self._client.publish(self._channel(room), _encode({**envelope, "_lang": lang}))
+
+    async def _listen(self):
+        """Deliver bus messages to this node; resubscribes with backoff if Redis drops."""
+        delay = 0.5
+        while True:
+            try:
+                if self._pubsub is None:
+                    await self._subscribe()
+                    # Redis may have restarted and lost our presence with it
+                    for room in list(self._local):
+                        await self._write_presence(room)
+                    logger.info("room bus resubscribed node=%s", self.node_id)
+                    delay = 0.5
+                await self._consume()
+                raise ConnectionError("subscription ended")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("room bus listener lost error=%s retry_in=%.1fs", e, delay)
+                await self._close_pubsub()
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, ROOM_BUS_RECONNECT_MAX)
+
+    async def _consume(self):
+        prefix = self._channel("")
+        async for item in self._pubsub.listen():
+            if item.get("type") != "pmessage":
+                continue
+            channel = item["channel"]
+            if isinstance(channel, bytes):
+                channel = channel.decode()
+            room = channel[len(prefix):]
+            if room not in self._local:
+                continue  # nobody on this node listens to that room
+            try:
+                envelope = _decode(item["data"])
+                await self._deliver(room, envelope.pop("_lang", None), envelope)
+            except Exception:
+                logger.exception("room bus delivery failed room=%s", room)
+
+    async def _write_presence(self, room: str):
+        key = self._presence_key(room, self.node_id)
+        counts = self._local.get(room)
+        pipe = self._client.pipeline()
+        pipe.delete(key)
+        if counts:
+            pipe.hset(key, mapping={lang: n for lang, n in counts.items()})
+            pipe.expire(key, self.presence_ttl)
+            pipe.sadd(self._nodes_key(room), self.node_id)
+        else:
+            pipe.srem(self._nodes_key(room), self.node_id)
+        await pipe.execute()
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(self.presence_ttl / 3)
+            for room in list(self._local):
+                try:
+                    await self._write_presence(room)
+                except Exception as e:
+                    logger.warning("presence refresh failed room=%s error=%s", room, e)
+
+    async def join(self, room: str, lang: str):
+        await super().join(room, lang)
+        await self._write_presence(room)
+
+    async def leave(self, room: str, lang: str):
+        await super().leave(room, lang)
+        await self._write_presence(room)
+
+    async def presence(self, room: str) -> Dict[str, int]:
+        nodes = await self._client.smembers(self._nodes_key(room))
+        if not nodes:
+            return {}
+        nodes = [n.decode() if isinstance(n, bytes) else n for n in nodes]
+        pipe = self._client.pipeline()
+        for node in nodes:
+            pipe.hgetall(self._presence_key(room, node))
+        results = await pipe.execute()
+
+        totals = Counter()
+        expired = []
+        for node, counts in zip(nodes, results):
+            if not counts:
+                expired.append(node)  # node died without cleaning up
+                continue
+            for lang, n in counts.items():
+                lang = lang.decode() if isinstance(lang, bytes) else lang
+                totals[lang] += int(n)
+        if expired:
+            await self._client.srem(self._nodes_key(room), *expired)
+        return {lang: n for lang, n in totals.items() if n > 0}
+
+
+def create_room_bus(kind: str = ROOM_BUS) -> RoomBus:
+    if kind == "redis":
+        return RedisRoomBus()
+    if kind == "memory":
+        return InProcessRoomBus()
+    raise ValueError(f"Unknown ROOM_BUS backend: {kind}")
+
+
+room_bus = create_room_bus()
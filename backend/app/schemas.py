@@ -1,11 +1,14 @@
 from pydantic import BaseModel
 from datetime import datetime
+from typing import Optional
 
 class MessageCreate(BaseModel):
     username: str
     room: str
     content: str
     timestamp: datetime
+    uid: Optional[str] = None  # assigned before persistence so translations can reference it
+    language: Optional[str] = None  # detected language of `content`
 
     class Config:
         from_attributes = True  # Pydantic v2+ only
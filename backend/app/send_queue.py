@@ -0,0 +1,117 @@
+import asyncio
+import os
+from collections import deque
+
+from dotenv import load_dotenv
+from fastapi import WebSocket
+
+from .metrics import BYTES_SENT, MESSAGES_DROPPED, MESSAGES_SENT
+
+load_dotenv()
+
+# SEND_QUEUE_SIZE: outbound payloads buffered per socket
+# SEND_QUEUE_POLICY: what to do when it is full
+#   drop_oldest - discard the oldest queued payload
+#   coalesce    - replace a queued payload with the same coalesce key, else drop oldest
+#   disconnect  - close the socket as a slow consumer
+# SEND_TIMEOUT: seconds a single frame may take before the socket is considered dead
+SEND_QUEUE_SIZE = int(os.getenv("SEND_QUEUE_SIZE", "256"))
+SEND_QUEUE_POLICY = os.getenv("SEND_QUEUE_POLICY", "drop_oldest")
+SEND_TIMEOUT = float(os.getenv("SEND_TIMEOUT", "10"))
+OVERFLOW_POLICIES = ("drop_oldest", "coalesce", "disconnect")
+
+# WebSocket close code 1013: "try again later"
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+
+class ClientSender:
+    """Bounded outbound queue plus a writer task for one socket.
+
+    Producers call ``enqueue`` and never wait on the network, so one slow client
+    cannot hold up delivery to the rest of its room.
+    """
+
+    def __init__(self, websocket: WebSocket, on_dead, maxsize=SEND_QUEUE_SIZE,
+                 policy=SEND_QUEUE_POLICY, send_timeout=SEND_TIMEOUT):
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown SEND_QUEUE_POLICY: {policy}")
+        self.websocket = websocket
+        self.maxsize = maxsize
+        self.policy = policy
+        self.send_timeout = send_timeout
+        self._on_dead = on_dead
+        self._queue = deque()  # (coalesce_key, payload)
+        self._ready = asyncio.Event()
+        self._task = None
+        self.closed = False
+        self.dropped = 0
+        self.sent = 0
+
+    @property
+    def depth(self):
+        return len(self._queue)
+
+    def start(self):
+        self._task = asyncio.create_task(self._writer())
+
+    def enqueue(self, payload, coalesce_key=None) -> bool:
+        """Queue a payload (JSON string or tuple of frames); False if the socket is gone."""
+        if self.closed:
+            return False
+        if self.policy == "coalesce" and coalesce_key is not None:
+            for i, (key, _) in enumerate(self._queue):
+                if key == coalesce_key:
+                    self._queue[i] = (coalesce_key, payload)
+                    self.dropped += 1
+                    MESSAGES_DROPPED.inc()
+                    return True
+        if len(self._queue) >= self.maxsize:
+            if self.policy == "disconnect":
+                self._fail(f"send queue overflow ({self.maxsize})", code=SLOW_CONSUMER_CLOSE_CODE)
+                return False
+            self._queue.popleft()
+            self.dropped += 1
+            MESSAGES_DROPPED.inc()
+        self._queue.append((coalesce_key, payload))
+        self._ready.set()
+        return True
+
+    async def _writer(self):
+        try:
+            while True:
+                await self._ready.wait()
+                while self._queue:
+                    _, payload = self._queue.popleft()
+                    frames = payload if isinstance(payload, (list, tuple)) else (payload,)
+                    for frame in frames:
+                        if isinstance(frame, bytes):
+                            await asyncio.wait_for(self.websocket.send_bytes(frame), self.send_timeout)
+                            BYTES_SENT.inc(len(frame), frame="binary")
+                        else:
+                            await asyncio.wait_for(self.websocket.send_text(frame), self.send_timeout)
+                            BYTES_SENT.inc(len(frame.encode()), frame="text")
+                    self.sent += 1
+                    MESSAGES_SENT.inc()
+                self._ready.clear()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._fail(f"send failed: {e!r}")
+
+    def _fail(self, reason, code=None):
+        if self.closed:
+            return
+        self.closed = True
+        self._queue.clear()
+        asyncio.get_running_loop().create_task(self._on_dead(self.websocket, reason, code))
+
+    async def close(self):
+        self.closed = True
+        self._queue.clear()
+        if self._task is not None and self._task is not asyncio.current_task():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
@@ -0,0 +1,260 @@
+import asyncio
+import importlib
+import logging
+import os
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from . import metrics
+from .executors import executors
+from .metrics import TRANSLATE_BATCH_TEXTS, TRANSLATE_REQUESTS
+from .translation_cache import translation_cache
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Translations requested within a short window are coalesced: identical requests
+# share one result and cache hits are answered together. The rest go to the backend
+# in one call per (src, dest) pair when it has a real batch request, otherwise
+# concurrently across the I/O pool, one text per call.
+# TRANSLATE_BATCH_WINDOW_MS: how long the first request waits for others to join it
+# TRANSLATE_BATCH_MAX: texts per backend call; a full group is sent without waiting
+# TRANSLATE_JOIN_LINES: "1" lets the googletrans backend send several single-line texts
+#                       as one newline-joined request (never with auto-detected sources)
+# TRANSLATE_BATCH_MAX_CHARS: characters per joined request (Google rejects ~5000+)
+# TRANSLATE_BACKEND: "googletrans" (default) or "module:callable" returning a backend,
+#                    e.g. a local stub or an offline model
+TRANSLATE_BATCH_WINDOW_MS = float(os.getenv("TRANSLATE_BATCH_WINDOW_MS", "5"))
+TRANSLATE_BATCH_MAX = int(os.getenv("TRANSLATE_BATCH_MAX", "32"))
+TRANSLATE_JOIN_LINES = os.getenv("TRANSLATE_JOIN_LINES", "0").lower() in ("1", "true", "yes", "on")
+TRANSLATE_BATCH_MAX_CHARS = int(os.getenv("TRANSLATE_BATCH_MAX_CHARS", "4500"))
+TRANSLATE_BACKEND = os.getenv("TRANSLATE_BACKEND", "googletrans")
+
+Key = Tuple[str, str, str]  # translation_cache key: (src, dest, normalized text)
+
+
+class TranslationBackend(ABC):
+    """What the batcher needs from a translator. Called from executor threads."""
+
+    @abstractmethod
+    def translate_batch(self, texts: List[str], src: str, dest: str) -> List[str]:
+        """Translate every text from ``src`` to ``dest``, in order; raise on failure."""
+
+    def translate(self, text: str, src: str, dest: str) -> str:
+        return self.translate_batch([text], src, dest)[0]
+
+    def supports_batching(self, src: str) -> bool:
+        """True when ``translate_batch`` costs one round trip, not one per text.
+
+        Otherwise the batcher sends texts concurrently through ``translate``.
+        """
+        return False
+
+
+class GoogletransBackend(TranslationBackend):
+    """googletrans over one shared Translator, so its HTTP connections are kept alive.
+
+    Texts are translated one request each unless ``join_lines`` is set. Then
+    single-line texts with a known source language are sent as one newline-joined
+    request, and retried one by one if the reply does not split back into as many
+    lines. Joining is opt-in: a matching line count does not prove the lines line
+    up, and with an auto-detected source Google would pick one language for
+    unrelated messages.
+    """
+
+    def __init__(self, translator=None, join_lines: bool = TRANSLATE_JOIN_LINES):
+        if translator is None:
+            from googletrans import Translator
+            translator = Translator()
+        self.translator = translator
+        self.join_lines = join_lines
+
+    def _translate(self, text, src, dest):
+        return self.translator.translate(text, src=src, dest=dest).text
+
+    def translate(self, text, src, dest):
+        return self._translate(text, src, dest)
+
+    def supports_batching(self, src):
+        return self.join_lines and src != "auto"
+
+    def translate_batch(self, texts, src, dest):
+        if not self.supports_batching(src):
+            return [self._translate(text, src, dest) for text in texts]
+        results: List[Optional[str]] = [None] * len(texts)
+        # Group indexes into requests under TRANSLATE_BATCH_MAX_CHARS; multi-line texts go alone
+        chunks, chunk, size = [], [], 0
+        for i, text in enumerate(texts):
+            if "\n" in text:
+                chunks.append([i])
+                continue
+            if chunk and size + len(text) + 1 > TRANSLATE_BATCH_MAX_CHARS:
+                chunks.append(chunk)
+                chunk, size = [], 0
+            chunk.append(i)
+            size += len(text) + 1
+        if chunk:
+            chunks.append(chunk)
+
+        for indexes in chunks:
+            if len(indexes) == 1:
+                results[indexes[0]] = self._translate(texts[indexes[0]], src, dest)
+                continue
+            lines = self._translate("\n".join(texts[i] for i in indexes), src, dest).split("\n")
+            if len(lines) == len(indexes):
+                for i, line in zip(indexes, lines):
+                    results[i] = line
+            else:
+                logger.debug("translate batch split mismatch sent=%d got=%d", len(indexes), len(lines))
+                for i in indexes:
+                    results[i] = self._translate(texts[i], src, dest)
+        return results
+
+
+def load_backend(spec: str = TRANSLATE_BACKEND) -> TranslationBackend:
+    if spec == "googletrans":
+        return GoogletransBackend()
+    module_name, _, attr = spec.partition(":")
+    return getattr(importlib.import_module(module_name), attr)()
+
+
+class TranslationBatcher:
+    """Coalesces concurrent translation requests into deduplicated batch calls.
+
+    Runs on the event loop; backend calls go through the I/O thread pool. The
+    persistent translation cache is consulted in that thread before the backend,
+    and results are stored there, exactly as ``cached_translate`` does.
+    """
+
+    def __init__(self, backend: Optional[TranslationBackend] = None,
+                 window_ms: float = TRANSLATE_BATCH_WINDOW_MS, max_batch: int = TRANSLATE_BATCH_MAX):
+        self._backend = backend
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self._waiting: Dict[Key, asyncio.Future] = {}  # queued or in flight
+        self._groups: Dict[Tuple[str, str], Dict[Key, str]] = {}  # (src, dest) -> {key: text}
+        self._timer = None
+        self._tasks = set()
+
+    @property
+    def backend(self) -> TranslationBackend:
+        if self._backend is None:
+            self._backend = load_backend()
+        return self._backend
+
+    @backend.setter
+    def backend(self, backend: TranslationBackend):
+        self._backend = backend
+
+    async def translate(self, text: str, src: str = "auto", dest: str = "en") -> str:
+        """Translate one text; raises if the backend call failed."""
+        key = translation_cache.make_key(text, src, dest)
+        future = self._waiting.get(key)
+        if future is not None:
+            TRANSLATE_REQUESTS.inc(outcome="coalesced")
+        else:
+            future = self._waiting[key] = asyncio.get_running_loop().create_future()
+            group = self._groups.setdefault((key[0], dest), {})
+            group[key] = text
+            if len(group) >= self.max_batch:
+                self._dispatch(key[0], dest)
+            elif self._timer is None:
+                self._timer = asyncio.get_running_loop().call_later(self.window, self._dispatch_all)
+        # Shielded: one caller giving up must not cancel the result for the others
+        return await asyncio.shield(future)
+
+    def _dispatch_all(self):
+        self._timer = None
+        for src, dest in list(self._groups):
+            self._dispatch(src, dest)
+
+    def _dispatch(self, src, dest):
+        group = self._groups.pop((src, dest), None)
+        if group:
+            task = asyncio.ensure_future(self._run(src, dest, group))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        if not self._groups and self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    async def _run(self, src, dest, group: Dict[Key, str]):
+        keys = list(group)
+        TRANSLATE_BATCH_TEXTS.observe(len(keys))
+        try:
+            with metrics.stage("translate"):
+                results = await self._translate_group(keys, group, src, dest)
+        except Exception as e:
+            results = [e] * len(keys)
+        failed = [result for result in results if isinstance(result, Exception)]
+        if failed:
+            logger.warning("translate failed dest=%s texts=%d failed=%d error=%s", dest, len(keys), len(failed), failed[0])
+        for key, result in zip(keys, results):
+            future = self._waiting.pop(key)
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+                future.exception()  # retrieved here so unawaited failures are not logged
+            else:
+                future.set_result(result)
+
+    async def _translate_group(self, keys, group, src, dest):
+        """Cache lookups in one executor call, then the misses: one batch call if the
+        backend has a real batch request, else one concurrent call per text.
+
+        Returns one translation or exception per key.
+        """
+        results = await executors.run_io(self._lookup, keys, group, src, dest)
+        misses = [key for key in keys if key not in results]
+        TRANSLATE_REQUESTS.inc(len(keys) - len(misses), outcome="cached")
+        if misses:
+            backend = self.backend
+            if backend.supports_batching(src):
+                TRANSLATE_REQUESTS.inc(len(misses), outcome="batched")
+                translated = await executors.run_io(self._translate_batch, backend, misses, group, src, dest)
+            else:
+                # A loop over translate_batch would pay one round trip per text in series
+                TRANSLATE_REQUESTS.inc(len(misses), outcome="single")
+                translated = await asyncio.gather(*(
+                    executors.run_io(self._translate_one, backend, group[key], src, dest) for key in misses
+                ), return_exceptions=True)
+            results.update(zip(misses, translated))
+        return [results[key] for key in keys]
+
+    @staticmethod
+    def _lookup(keys, group, src, dest):
+        results = {}
+        for key in keys:
+            cached = translation_cache.get(group[key], src, dest)
+            if cached is not None:
+                results[key] = cached
+        return results
+
+    @staticmethod
+    def _translate_batch(backend, keys, group, src, dest):
+        translated = backend.translate_batch([group[key] for key in keys], src, dest)
+        for key, text in zip(keys, translated):
+            translation_cache.put(group[key], src, dest, text)
+        return translated
+
+    @staticmethod
+    def _translate_one(backend, text, src, dest):
+        translated = backend.translate(text, src, dest)
+        translation_cache.put(text, src, dest, translated)
+        return translated
+
+    def stats(self):
+        return {
+            "window_ms": self.window * 1000,
+            "max_batch": self.max_batch,
+            "waiting": len(self._waiting),
+            "queued_groups": len(self._groups),
+            "backend": type(self._backend).__name__ if self._backend else None,
+        }
+
+
+translation_batcher = TranslationBatcher()
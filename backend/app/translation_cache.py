@@ -0,0 +1,160 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# TRANSLATION_CACHE_SIZE: max in-memory entries (0 disables the cache)
+# TRANSLATION_CACHE_TTL: seconds an entry stays valid (0 = never expires)
+# TRANSLATION_CACHE_DB: optional SQLite file so warm entries survive restarts
+CACHE_SIZE = int(os.getenv("TRANSLATION_CACHE_SIZE", "10000"))
+CACHE_TTL = float(os.getenv("TRANSLATION_CACHE_TTL", "86400"))
+CACHE_DB = os.getenv("TRANSLATION_CACHE_DB", "")
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text):
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+class SQLiteTranslationStore:
+    """Persistent second tier; only consulted on in-memory misses."""
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS translations ("
+            " src TEXT NOT NULL, dest TEXT NOT NULL, text TEXT NOT NULL,"
+            " translated TEXT NOT NULL, created_at REAL NOT NULL,"
+            " PRIMARY KEY (src, dest, text))"
+        )
+        self._conn.commit()
+
+    def get(self, key, min_created_at):
+        src, dest, text = key
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT translated, created_at FROM translations WHERE src = ? AND dest = ? AND text = ? AND created_at >= ?",
+                (src, dest, text, min_created_at),
+            ).fetchone()
+        return row
+
+    def put(self, key, translated, created_at):
+        src, dest, text = key
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO translations (src, dest, text, translated, created_at) VALUES (?, ?, ?, ?, ?)",
+                (src, dest, text, translated, created_at),
+            )
+            self._conn.commit()
+
+    def purge(self, min_created_at):
+        with self._lock:
+            self._conn.execute("DELETE FROM translations WHERE created_at < ?", (min_created_at,))
+            self._conn.commit()
+
+
+class TranslationCache:
+    """Size-bounded LRU with TTL, keyed on (normalized text, src, dest)."""
+
+    def __init__(self, max_entries=CACHE_SIZE, ttl=CACHE_TTL, store=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.store = store
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(text, src, dest):
+        return (src or "auto", dest, normalize_text(text))
+
+    def _min_created_at(self, now):
+        return now - self.ttl if self.ttl > 0 else 0
+
+    def get(self, text, src, dest, use_store=True):
+        """Look up a translation; ``use_store=False`` checks memory only (safe on the event loop)."""
+        if self.max_entries <= 0:
+            return None
+        key = self.make_key(text, src, dest)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                translated, created_at = entry
+                if created_at >= self._min_created_at(now):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return translated
+                del self._entries[key]
+
+        if not use_store:
+            return None
+        row = self.store.get(key, self._min_created_at(now)) if self.store else None
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._insert(key, row[0], row[1])
+        return row[0]
+
+    def put(self, text, src, dest, translated):
+        if self.max_entries <= 0 or not normalize_text(text):
+            return
+        key = self.make_key(text, src, dest)
+        now = time.time()
+        with self._lock:
+            self._insert(key, translated, now)
+        if self.store:
+            self.store.put(key, translated, now)
+
+    def _insert(self, key, translated, created_at):
+        self._entries[key] = (translated, created_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "persistent": self.store is not None,
+            }
+
+
+translation_cache = TranslationCache(store=SQLiteTranslationStore(CACHE_DB) if CACHE_DB else None)
+if translation_cache.store and translation_cache.ttl > 0:
+    translation_cache.store.purge(time.time() - translation_cache.ttl)
+
+
+def cached_translate(text, src, dest, translate):
+    """Return a cached translation or call ``translate()`` and remember its result.
+
+    ``translate`` must raise on failure so fallbacks never end up in the cache.
+    """
+    cached = translation_cache.get(text, src, dest)
+    if cached is not None:
+        return cached
+    translated = translate()
+    translation_cache.put(text, src, dest, translated)
+    return translated
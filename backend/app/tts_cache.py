@@ -0,0 +1,163 @@
+import hashlib
+import os
+import threading
+import uuid
+from collections import OrderedDict
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# TTS_CACHE_DIR: where synthesized clips live (one <sha256>.mp3 per (text, lang))
+# TTS_CACHE_MAX_BYTES: total size before least-recently-used clips are evicted
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", os.path.join(os.path.dirname(__file__), '..', 'cache', 'tts'))
+TTS_CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+
+def tts_digest(text, lang):
+    return hashlib.sha256(f"{lang}\0{text}".encode("utf-8")).hexdigest()
+
+
+class TTSCache:
+    """Content-addressed store of synthesized speech keyed by (text, lang)."""
+
+    def __init__(self, directory=TTS_CACHE_DIR, max_bytes=TTS_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._sizes = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        # Rebuild the LRU order from disk, oldest access first
+        entries = []
+        for name in os.listdir(directory):
+            if name.endswith(".mp3"):
+                st = os.stat(os.path.join(directory, name))
+                entries.append((st.st_mtime, name[:-4], st.st_size))
+        for _, digest, size in sorted(entries):
+            self._sizes[digest] = size
+            self.total_bytes += size
+        self._evict()
+
+    def path_for(self, digest):
+        return os.path.join(self.directory, f"{digest}.mp3")
+
+    def lookup(self, digest):
+        """Path of a cached clip, or None."""
+        with self._lock:
+            if digest not in self._sizes:
+                return None
+            self._sizes.move_to_end(digest)
+        return self.path_for(digest)
+
+    def read(self, digest):
+        """Bytes of a cached clip, or None if it has been evicted."""
+        path = self.lookup(digest)
+        if path is None:
+            return None
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def get_or_synthesize(self, text, lang, synthesize):
+        """Return (digest, audio bytes), calling ``synthesize(text, lang, path)`` at most once per key."""
+        digest = tts_digest(text, lang)
+        path = self.path_for(digest)
+        with self._lock:
+            hit = digest in self._sizes
+            if hit:
+                self._sizes.move_to_end(digest)
+                self.hits += 1
+
+        if hit:
+            try:
+                with open(path, "rb") as f:
+                    return digest, f.read()
+            except FileNotFoundError:
+                with self._lock:
+                    self._forget(digest)
+
+        with self._lock:
+            key_lock = self._inflight.setdefault(digest, threading.Lock())
+        # Concurrent requests for the same phrase share one synthesis
+        with key_lock:
+            try:
+                if not os.path.exists(path):
+                    tmp_path = os.path.join(self.directory, f".{digest}.{uuid.uuid4().hex}.tmp")
+                    try:
+                        synthesize(text, lang, tmp_path)
+                        os.replace(tmp_path, path)
+                    finally:
+                        if os.path.exists(tmp_path):
+                            os.remove(tmp_path)
+                    with self._lock:
+                        self.misses += 1
+                with open(path, "rb") as f:
+                    data = f.read()
+                with self._lock:
+                    self._record(digest, len(data))
+                    self._evict(keep=digest)
+            finally:
+                with self._lock:
+                    self._inflight.pop(digest, None)
+        return digest, data
+
+    def store(self, digest, data):
+        """Insert a clip synthesized elsewhere (e.g. on another node); no-op if present."""
+        path = self.path_for(digest)
+        with self._lock:
+            if digest in self._sizes:
+                self._sizes.move_to_end(digest)
+                return
+        if not os.path.exists(path):
+            tmp_path = os.path.join(self.directory, f".{digest}.{uuid.uuid4().hex}.tmp")
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        with self._lock:
+            self._record(digest, len(data))
+            self._evict(keep=digest)
+
+    def _record(self, digest, size):
+        if digest not in self._sizes:
+            self._sizes[digest] = size
+            self.total_bytes += size
+        self._sizes.move_to_end(digest)
+
+    def _forget(self, digest):
+        size = self._sizes.pop(digest, None)
+        if size is not None:
+            self.total_bytes -= size
+
+    def _evict(self, keep=None):
+        while self.total_bytes > self.max_bytes and len(self._sizes) > 1:
+            digest = next(iter(self._sizes))
+            if digest == keep:
+                break
+            self._forget(digest)
+            self.evictions += 1
+            try:
+                os.remove(self.path_for(digest))
+            except FileNotFoundError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._sizes),
+                "total_bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+tts_cache = TTSCache()
@@ -0,0 +1,125 @@
+import os
+from typing import List, NamedTuple, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+from .audio_ingest import SAMPLE_RATE
+
+load_dotenv()
+
+# Energy-based voice activity detection run before Whisper, whose cost grows
+# with clip length and which spends a full decode even on silence.
+# VAD_ENABLED: "0" sends decoded audio to Whisper untouched
+# VAD_FRAME_MS: analysis frame length
+# VAD_MIN_DB: frames quieter than this (dBFS) are never speech
+# VAD_MARGIN_DB: speech must be this far above the clip's noise floor
+# VAD_PAD_MS: audio kept on either side of speech so word edges are not clipped
+# VAD_MAX_PAUSE_MS: pauses longer than this split the clip; shorter ones are kept
+# VAD_MIN_SPEECH_MS: clips with less speech than this are rejected as silent
+# VAD_JOIN_GAP_MS: silence left between segments when they are stitched back together
+VAD_ENABLED = os.getenv("VAD_ENABLED", "1").lower() not in ("0", "false", "no", "off")
+VAD_FRAME_MS = int(os.getenv("VAD_FRAME_MS", "30"))
+VAD_MIN_DB = float(os.getenv("VAD_MIN_DB", "-45"))
+VAD_MARGIN_DB = float(os.getenv("VAD_MARGIN_DB", "12"))
+VAD_PAD_MS = int(os.getenv("VAD_PAD_MS", "200"))
+VAD_MAX_PAUSE_MS = int(os.getenv("VAD_MAX_PAUSE_MS", "600"))
+VAD_MIN_SPEECH_MS = int(os.getenv("VAD_MIN_SPEECH_MS", "250"))
+VAD_JOIN_GAP_MS = int(os.getenv("VAD_JOIN_GAP_MS", "250"))
+
+# Speech sits well above the noise floor but not necessarily near the peak;
+# never demand more than this below the loudest frame
+_DYNAMIC_RANGE_DB = 20.0
+
+
+class SpeechSegments(NamedTuple):
+    segments: List[Tuple[int, int]]  # [start, end) sample offsets
+    speech_seconds: float
+    total_seconds: float
+    threshold_db: float
+
+    @property
+    def has_speech(self):
+        return bool(self.segments)
+
+
+def frame_energy_db(samples: np.ndarray, frame: int) -> np.ndarray:
+    """RMS level of each full frame in dBFS (the ragged tail is dropped)."""
+    count = len(samples) // frame
+    if count == 0:
+        return np.empty(0, dtype=np.float32)
+    frames = samples[:count * frame].reshape(count, frame)
+    rms = np.sqrt(np.mean(np.square(frames, dtype=np.float32), axis=1))
+    return 20 * np.log10(np.maximum(rms, 1e-10))
+
+
+def _runs(mask: np.ndarray) -> List[Tuple[int, int]]:
+    """[start, end) index pairs of the True runs in a boolean array."""
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    return list(zip(starts.tolist(), ends.tolist()))
+
+
+def detect_speech(samples: np.ndarray, sample_rate: int = SAMPLE_RATE) -> SpeechSegments:
+    """Find the speech in a mono float32 clip, split wherever a pause is longer than VAD_MAX_PAUSE_MS."""
+    total_seconds = len(samples) / sample_rate
+    frame = max(int(sample_rate * VAD_FRAME_MS / 1000), 1)
+    energy = frame_energy_db(samples, frame)
+    if energy.size == 0:
+        return SpeechSegments([], 0.0, total_seconds, VAD_MIN_DB)
+
+    # Adaptive threshold: noise floor + margin, bounded by the clip's dynamic range
+    noise_floor = float(np.percentile(energy, 10))
+    peak = float(energy.max())
+    threshold = max(VAD_MIN_DB, min(noise_floor + VAD_MARGIN_DB, peak - _DYNAMIC_RANGE_DB))
+    voiced = energy > threshold
+
+    # Bridge short pauses, drop runs too short to be speech (clicks, pops), then
+    # pad what is left so word edges survive. Filtering after padding would let
+    # a single loud frame grow past the minimum.
+    max_pause = int(VAD_MAX_PAUSE_MS / VAD_FRAME_MS)
+    for start, end in _runs(~voiced):
+        if 0 < start and end < len(voiced) and end - start <= max_pause:
+            voiced[start:end] = True
+    min_frames = max(int(VAD_MIN_SPEECH_MS / VAD_FRAME_MS), 1)
+    for start, end in _runs(voiced):
+        if end - start < min_frames:
+            voiced[start:end] = False
+    pad = int(VAD_PAD_MS / VAD_FRAME_MS)
+    if pad:
+        voiced = np.convolve(voiced, np.ones(2 * pad + 1), mode="same") > 0
+
+    segments = [
+        (start * frame, len(samples) if end == len(voiced) else end * frame)
+        for start, end in _runs(voiced)
+    ]
+    speech_seconds = sum(end - start for start, end in segments) / sample_rate
+    return SpeechSegments(segments, speech_seconds, total_seconds, threshold)
+
+
+def join_segments(samples: np.ndarray, segments, sample_rate: int = SAMPLE_RATE,
+                  gap_ms: int = VAD_JOIN_GAP_MS) -> np.ndarray:
+    """Stitch speech segments together with a short fixed gap.
+
+    One Whisper call over the compacted clip is cheaper than one call per
+    segment, since every call pays for at least a full 30 s encoder window.
+    """
+    if not segments:
+        return samples[:0]
+    gap = np.zeros(int(sample_rate * gap_ms / 1000), dtype=samples.dtype)
+    parts = []
+    for start, end in segments:
+        if parts:
+            parts.append(gap)
+        parts.append(samples[start:end])
+    return np.concatenate(parts)
+
+
+def trim_silence(samples: np.ndarray, sample_rate: int = SAMPLE_RATE):
+    """(speech-only clip, SpeechSegments); the clip is empty when nobody spoke."""
+    if not VAD_ENABLED:
+        seconds = len(samples) / sample_rate
+        return samples, SpeechSegments([(0, len(samples))] if len(samples) else [], seconds, seconds, VAD_MIN_DB)
+    speech = detect_speech(samples, sample_rate)
+    return join_segments(samples, speech.segments, sample_rate), speech
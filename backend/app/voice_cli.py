@@ -0,0 +1,29 @@
+import sounddevice as sd
+from scipy.io.wavfile import write
+from .voice_translator import speech_to_text, translate_text, speak_text
+
+# Record from the microphone and translate end to end:
+#   python -m app.voice_cli
+# Kept out of the server import path: sounddevice needs PortAudio.
+
+# 1️⃣ Step: Record voice
+def record_voice(filename="input.wav", duration=5, fs=16000):
+    print("🎙️ Speak now...")
+    audio = sd.rec(int(duration * fs), samplerate=fs, channels=1)
+    sd.wait()
+    write(filename, fs, audio)
+    print("✅ Voice saved:", filename)
+
+# 🧩 Main Execution
+if __name__ == "__main__":
+    # Set your source and target languages here
+    SOURCE_LANG = 'hi'       # Tu jis language me bolega
+    TARGET_LANG = 'en'       # Samne wale ko jis language me sunani hai
+
+    record_voice("input.wav", duration=5)
+    spoken_text = speech_to_text("input.wav", language_code=SOURCE_LANG)
+    print("📝 You said:", spoken_text)
+    translated_text = translate_text(spoken_text, src_lang=SOURCE_LANG, target_lang=TARGET_LANG)
+    print(f"🌐 Translated ({SOURCE_LANG} → {TARGET_LANG}):", translated_text)
+    speak_text(translated_text, lang=TARGET_LANG)
+    print("🔊 Saved translation to output.mp3")
@@ -0,0 +1,41 @@
+import asyncio
+import logging
+
+from . import metrics
+from .executors import executors
+from .tts_cache import tts_cache
+from .translate_batcher import translation_batcher
+from .voice_translator import speak_text
+
+logger = logging.getLogger(__name__)
+
+
+async def render_voice_variant(spoken_text, source_lang, target_lang):
+    """Translate and synthesize one transcript for one listener language."""
+    content = spoken_text
+    if target_lang != source_lang and spoken_text.strip():
+        try:
+            content = await translation_batcher.translate(spoken_text, source_lang, target_lang)
+        except Exception as e:
+            logger.warning("voice translate failed dest=%s error=%s", target_lang, e)
+
+    audio_digest, audio_bytes = None, None
+    if content.strip():
+        try:
+            with metrics.stage("tts"):
+                audio_digest, audio_bytes = await executors.run_io(
+                    tts_cache.get_or_synthesize, content, target_lang, speak_text
+                )
+        except Exception as e:
+            logger.warning("tts failed lang=%s error=%s", target_lang, e)
+
+    return {"content": content, "audio_digest": audio_digest, "audio_bytes": audio_bytes}
+
+
+async def render_voice_variants(spoken_text, source_lang, target_langs):
+    """Run translation + TTS once per distinct target language, in parallel."""
+    langs = list(dict.fromkeys(target_langs))
+    variants = await asyncio.gather(*(
+        render_voice_variant(spoken_text, source_lang, lang) for lang in langs
+    ))
+    return dict(zip(langs, variants))
@@ -0,0 +1,126 @@
+import os
+from typing import Awaitable, Callable, Optional
+
+import numpy as np
+from dotenv import load_dotenv
+
+from .audio_ingest import SAMPLE_RATE, pcm_to_float32
+from .vad import trim_silence
+
+load_dotenv()
+
+# Streaming voice over the room WebSocket: the client sends
+#   {"type": "voice_start"}, binary frames of 16 kHz mono s16le PCM, {"type": "voice_end"}
+# VOICE_STREAM_INTERVAL_MS: how often the uncommitted tail is re-transcribed for partial captions
+# VOICE_STREAM_WINDOW_SECONDS: longest tail re-transcribed before it is committed as-is
+# VOICE_STREAM_COMMIT_PAUSE_MS: trailing silence that commits the tail (the speaker paused)
+# VOICE_STREAM_MAX_SECONDS: longest stream accepted; later audio is ignored
+VOICE_STREAM_INTERVAL_MS = int(os.getenv("VOICE_STREAM_INTERVAL_MS", "400"))
+VOICE_STREAM_WINDOW_SECONDS = float(os.getenv("VOICE_STREAM_WINDOW_SECONDS", "15"))
+VOICE_STREAM_COMMIT_PAUSE_MS = int(os.getenv("VOICE_STREAM_COMMIT_PAUSE_MS", "500"))
+VOICE_STREAM_MAX_SECONDS = float(os.getenv("VOICE_STREAM_MAX_SECONDS", "120"))
+
+Transcribe = Callable[[np.ndarray], Awaitable[str]]
+
+_BYTES_PER_SAMPLE = 2
+
+
+def _join(*parts):
+    return " ".join(p for p in (part.strip() for part in parts) if p)
+
+
+def common_word_prefix(a: str, b: str) -> str:
+    """Longest run of leading words two hypotheses agree on."""
+    agreed = []
+    for x, y in zip(a.split(), b.split()):
+        if x != y:
+            break
+        agreed.append(x)
+    return " ".join(agreed)
+
+
+class VoiceStream:
+    """Incremental transcription of one utterance streamed as PCM chunks.
+
+    Audio before ``commit_offset`` is settled into ``committed``; only the tail
+    after it is re-transcribed on each step. Words two consecutive passes agree
+    on are reported as stable, so captions stop flickering once they settle.
+    The tail is committed when the speaker pauses or it reaches the window size.
+    """
+
+    def __init__(self, stream_id: str, language: str, sample_rate: int = SAMPLE_RATE,
+                 window_seconds: float = VOICE_STREAM_WINDOW_SECONDS,
+                 commit_pause_ms: int = VOICE_STREAM_COMMIT_PAUSE_MS,
+                 max_seconds: float = VOICE_STREAM_MAX_SECONDS):
+        self.stream_id = stream_id
+        self.language = language
+        self.sample_rate = sample_rate
+        self.window_seconds = window_seconds
+        self.commit_pause = commit_pause_ms / 1000
+        self.max_bytes = int(max_seconds * sample_rate) * _BYTES_PER_SAMPLE
+        self._pcm = bytearray()
+        self._odd = b""  # half a sample left over from the previous chunk
+        self._transcribed_bytes = 0
+        self.commit_offset = 0  # bytes
+        self.committed = ""
+        self._previous = ""
+        self.truncated = False
+
+    @property
+    def seconds(self):
+        return len(self._pcm) / _BYTES_PER_SAMPLE / self.sample_rate
+
+    def feed(self, chunk: bytes) -> bool:
+        """Append raw PCM; False once the stream has hit its length cap."""
+        room = self.max_bytes - len(self._pcm)
+        if room <= 0:
+            self.truncated = True
+            return False
+        data = self._odd + chunk
+        usable = len(data) - len(data) % _BYTES_PER_SAMPLE
+        self._odd = data[usable:]
+        self._pcm.extend(data[:min(usable, room)])
+        return True
+
+    def _tail(self, end: int) -> np.ndarray:
+        return pcm_to_float32(bytes(self._pcm[self.commit_offset:end]))
+
+    async def step(self, transcribe: Transcribe) -> Optional[dict]:
+        """Re-transcribe the uncommitted tail if new audio arrived.
+
+        Returns {"committed", "stable", "text"} (each a full caption so far), or
+        None when there was nothing new to say.
+        """
+        end = len(self._pcm)
+        if end == self._transcribed_bytes:
+            return None
+        self._transcribed_bytes = end
+        audio = self._tail(end)
+        speech_only, speech = trim_silence(audio, self.sample_rate)
+        if not speech.has_speech:
+            return None
+
+        hypothesis = (await transcribe(speech_only)).strip()
+        agreed = common_word_prefix(self._previous, hypothesis)
+        self._previous = hypothesis
+
+        trailing_silence = (len(audio) - speech.segments[-1][1]) / self.sample_rate
+        if trailing_silence >= self.commit_pause or len(audio) / self.sample_rate >= self.window_seconds:
+            self.committed = _join(self.committed, hypothesis)
+            self.commit_offset = end
+            self._previous = ""
+            return {"committed": self.committed, "stable": self.committed, "text": self.committed}
+        return {
+            "committed": self.committed,
+            "stable": _join(self.committed, agreed),
+            "text": _join(self.committed, hypothesis),
+        }
+
+    async def finish(self, transcribe: Transcribe) -> str:
+        """Final transcript: the committed text plus one last pass over the tail."""
+        audio = self._tail(len(self._pcm))
+        speech_only, speech = trim_silence(audio, self.sample_rate)
+        if speech.has_speech:
+            self.committed = _join(self.committed, await transcribe(speech_only))
+        self.commit_offset = len(self._pcm)
+        return self.committed
@@ -1,46 +1,36 @@
-import sounddevice as sd
-from scipy.io.wavfile import write
-import whisper
-from googletrans import Translator
-from gtts import gTTS
-import os
+import logging
+from .audio_ingest import SAMPLE_RATE
+from .model_registry import registry
+from .translation_cache import cached_translate
+from .translate_batcher import translation_batcher
 
-# 1️⃣ Step: Record voice
-def record_voice(filename="input.wav", duration=5, fs=16000):
-    print("🎙️ Speak now...")
-    audio = sd.rec(int(duration * fs), samplerate=fs, channels=1)
-    sd.wait()
-    write(filename, fs, audio)
-    print("✅ Voice saved:", filename)
+# Server-side voice helpers. Heavy dependencies (whisper/torch, gTTS) load on
+# first use; microphone recording lives in voice_cli so servers never need PortAudio.
 
-# 2️⃣ Step: Speech-to-Text using Whisper
-def speech_to_text(filename="input.wav", language_code='hi'):
-    model = whisper.load_model("base")
-    result = model.transcribe(filename, language=language_code)
-    print("📝 You said:", result["text"])
+logger = logging.getLogger(__name__)
+
+# Speech-to-Text using Whisper
+# `audio` is a file path or a 16 kHz mono float32 NumPy array (see audio_ingest.decode_audio)
+def speech_to_text(audio="input.wav", language_code='hi', endpoint=None, model_size=None):
+    # Arrays arrive VAD-trimmed, so their length is the amount of speech
+    duration = len(audio) / SAMPLE_RATE if not isinstance(audio, str) else None
+    model = registry.get(language=language_code, endpoint=endpoint, size=model_size, duration=duration)
+    result = model.transcribe(audio, language=language_code)
+    logger.debug("stt lang=%s text=%r", language_code, result["text"])
     return result["text"]
 
-# 3️⃣ Step: Translate text
+# Translate text
 def translate_text(text, src_lang='hi', target_lang='en'):
-    translator = Translator()
-    translated = translator.translate(text, src=src_lang, dest=target_lang)
-    print(f"🌐 Translated ({src_lang} → {target_lang}):", translated.text)
-    return translated.text
+    translated = cached_translate(
+        text, src_lang, target_lang,
+        lambda: translation_batcher.backend.translate_batch([text], src_lang, target_lang)[0],
+    )
+    logger.debug("translate src=%s dest=%s text=%r", src_lang, target_lang, translated)
+    return translated
 
-# 4️⃣ Step: Text-to-Speech using gTTS
+# Text-to-Speech using gTTS
 def speak_text(text, lang='en', filename="output.mp3"):
+    from gtts import gTTS
+
     tts = gTTS(text=text, lang=lang)
     tts.save(filename)
-    print("🔊 Playing translation...")
-    # os.system("start " + filename if os.name == "nt" else "afplay " + filename)
-
-# 🧩 Main Execution
-if __name__ == "__main__":
-    # Set your source and target languages here
-    SOURCE_LANG = 'hi'       # Tu jis language me bolega
-    TARGET_LANG = 'en'       # Samne wale ko jis language me sunani hai
-
-    record_voice("input.wav", duration=5)
-    spoken_text = speech_to_text("input.wav", language_code=SOURCE_LANG)
-    translated_text = translate_text(spoken_text, src_lang=SOURCE_LANG, target_lang=TARGET_LANG)
-    speak_text(translated_text, lang=TARGET_LANG)
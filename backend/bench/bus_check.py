@@ -0,0 +1,96 @@
+"""Exercise RedisRoomBus against fakeredis (no Redis server needed).
+
+    cd backend
+    python -m bench.bus_check
+
+Two bus nodes share one in-memory Redis. Checks cluster-wide presence, that an
+envelope published on one node (audio bytes included) is delivered on the other
+and not to a node without listeners in the room, and that a node keeps
+delivering after its subscription is dropped. Exits non-zero on the first failure.
+"""
+import asyncio
+import sys
+
+try:
+    import fakeredis
+except ImportError:
+    sys.exit("bench.bus_check needs the 'fakeredis' package")
+
+from app.room_bus import RedisRoomBus
+
+
+class Node:
+    def __init__(self, server, name):
+        self.name = name
+        self.received = asyncio.Queue()
+        client = fakeredis.aioredis.FakeRedis(server=server)
+        self.bus = RedisRoomBus(prefix="bus-check", presence_ttl=30, client=client)
+
+    async def deliver(self, room, lang, envelope):
+        await self.received.put((room, lang, envelope))
+
+    async def expect(self, timeout=2.0):
+        return await asyncio.wait_for(self.received.get(), timeout)
+
+    async def expect_nothing(self, timeout=0.2):
+        try:
+            item = await asyncio.wait_for(self.received.get(), timeout)
+        except asyncio.TimeoutError:
+            return
+        raise AssertionError(f"{self.name} got an unexpected delivery: {item!r}")
+
+
+async def check():
+    server = fakeredis.FakeServer()
+    a, b, idle = Node(server, "a"), Node(server, "b"), Node(server, "idle")
+    for node in (a, b, idle):
+        await node.bus.start(node.deliver)
+    try:
+        await a.bus.join("lobby", "en")
+        await b.bus.join("lobby", "fr")
+        await b.bus.join("lobby", "fr")
+        presence = await idle.bus.presence("lobby")
+        assert presence == {"en": 1, "fr": 2}, presence
+        print("presence ok", presence)
+
+        envelope = {"kind": "voice", "message": {"content": "salut"}, "audio_digest": "d1",
+                    "audio": b"\x00\xffID3", "uid": "u1"}
+        await a.bus.publish("lobby", "fr", envelope)
+        room, lang, got = await b.expect()
+        assert (room, lang, got) == ("lobby", "fr", envelope), (room, lang, got)
+        # The publisher's node has listeners too, so it delivers its own publish
+        await a.expect()
+        await idle.expect_nothing()
+        print("publish/deliver ok")
+
+        # Drop b's subscription under it: the listener must resubscribe and carry on
+        await b.bus._pubsub.aclose()
+        for _ in range(50):
+            await asyncio.sleep(0.1)
+            await a.bus.publish("lobby", None, {"kind": "text", "text": "after drop", "uid": "u2"})
+            try:
+                room, lang, got = await b.expect(timeout=0.1)
+                break
+            except asyncio.TimeoutError:
+                continue
+        else:
+            raise AssertionError("b stopped delivering after its subscription dropped")
+        assert got["text"] == "after drop", got
+        print("resubscribe ok")
+
+        await b.bus.leave("lobby", "fr")
+        await b.bus.leave("lobby", "fr")
+        presence = await a.bus.presence("lobby")
+        assert presence == {"en": 1}, presence
+        print("leave ok", presence)
+    finally:
+        for node in (a, b, idle):
+            await node.bus.stop()
+
+
+def main():
+    asyncio.run(check())
+
+
+if __name__ == "__main__":
+    sys.exit(main())
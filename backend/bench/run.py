@@ -0,0 +1,408 @@
+"""Offline load test for room fan-out and the voice pipeline.
+
+Starts ``bench.server`` (stub translator/TTS/STT, SQLite, in-process room bus) in
+a subprocess, opens N WebSocket clients across M rooms with mixed languages,
+drives chat (and optionally voice) traffic and prints one JSON document:
+
+    cd backend
+    python -m bench.run --clients 200 --rooms 20 --messages 50 --output before.json
+
+Delivery latency is measured from the moment a sender writes a message to the
+moment each room member receives it. Memory per connection is the server's RSS
+growth while the idle clients connect, divided by the client count (Linux only).
+Voice traffic needs ffmpeg, as in production.
+"""
+import argparse
+import asyncio
+import io
+import json
+import math
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+import uuid
+import wave
+
+import numpy as np
+import websockets
+
+from bench.stubs import bench_content, parse_bench_content
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of an unsorted list (None when empty)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(math.ceil(pct / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def summarize(latencies_ms):
+    return {
+        "count": len(latencies_ms),
+        "p50": percentile(latencies_ms, 50),
+        "p95": percentile(latencies_ms, 95),
+        "p99": percentile(latencies_ms, 99),
+        "max": max(latencies_ms, default=None),
+        "mean": sum(latencies_ms) / len(latencies_ms) if latencies_ms else None,
+    }
+
+
+def process_rss(pid):
+    """Resident set size in bytes from /proc, or None where that is unavailable."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def http_get(url, timeout=5):
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        return response.read()
+
+
+def http_post_multipart(url, fields, files, timeout=120):
+    """POST multipart/form-data with the standard library; returns (status, body)."""
+    boundary = uuid.uuid4().hex
+    body = io.BytesIO()
+    for name, value in fields.items():
+        body.write(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    for name, (filename, data, content_type) in files.items():
+        body.write(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+            f'Content-Type: {content_type}\r\n\r\n'.encode()
+        )
+        body.write(data)
+        body.write(b"\r\n")
+    body.write(f"--{boundary}--\r\n".encode())
+    request = urllib.request.Request(
+        url, data=body.getvalue(), method="POST",
+        headers={"Content-Type": f"multipart/form-data; boundary={boundary}"},
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+
+
+def synth_wav(seconds, sample_rate=16000):
+    """A mono 16-bit tone, enough for ffmpeg and the STT stage to chew on."""
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    samples = (0.3 * np.sin(2 * np.pi * 220 * t) * 32767).astype("<i2")
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(sample_rate)
+        w.writeframes(samples.tobytes())
+    return buf.getvalue()
+
+
+def parse_stage_metrics(text):
+    """Mean latency and count per pipeline stage from the server's /metrics output."""
+    sums, counts, errors = {}, {}, {}
+    for line in text.splitlines():
+        if 'stage="' not in line or line.startswith("#"):
+            continue
+        name, value = line.rsplit(" ", 1)
+        stage = name.split('stage="', 1)[1].split('"', 1)[0]
+        if name.startswith("translingo_stage_seconds_sum"):
+            sums[stage] = float(value)
+        elif name.startswith("translingo_stage_seconds_count"):
+            counts[stage] = int(float(value))
+        elif name.startswith("translingo_stage_errors_total"):
+            errors[stage] = int(float(value))
+    return {
+        stage: {
+            "count": counts[stage],
+            "mean_ms": sums.get(stage, 0.0) / counts[stage] * 1000 if counts[stage] else None,
+            "errors": errors.get(stage, 0),
+        }
+        for stage in sorted(counts)
+    }
+
+
+class Client:
+    """One simulated browser tab: joins a room and records what it receives."""
+
+    def __init__(self, client_id, room, lang, base_url, stats):
+        self.client_id = client_id
+        self.room = room
+        self.lang = lang
+        self.url = f"{base_url}/ws/{room}/u{client_id}"
+        self.stats = stats
+        self.ws = None
+        self._reader = None
+
+    async def connect(self):
+        self.ws = await websockets.connect(self.url, max_size=None)
+        await self.ws.send(json.dumps({"preferred_language": self.lang, "audio_mode": "url"}))
+        await self.ws.recv()  # join confirmation
+        self._reader = asyncio.create_task(self._read())
+
+    async def _read(self):
+        try:
+            async for frame in self.ws:
+                received_ns = time.time_ns()
+                if isinstance(frame, bytes):
+                    continue
+                message = json.loads(frame)
+                if "audio_url" in message or "audio_base64" in message:
+                    self.stats.voice_delivered(self.room, received_ns)
+                    continue
+                parsed = parse_bench_content(message.get("original_content"))
+                if parsed is not None:
+                    self.stats.text_delivered((received_ns - parsed[3]) / 1e6)
+        except websockets.ConnectionClosed:
+            pass
+
+    async def send(self, seq):
+        await self.ws.send(json.dumps({"content": bench_content(self.lang, self.client_id, seq, time.time_ns())}))
+        self.stats.sent += 1
+
+    async def close(self):
+        await self.ws.close()
+        if self._reader is not None:
+            await self._reader
+
+
+class Stats:
+    def __init__(self):
+        self.sent = 0
+        self.text_latencies = []
+        self.voice_started = {}  # room -> send time (ns) of its in-flight voice message
+        self.voice_latencies = {}  # room -> [ms]
+        self.changed = asyncio.Event()
+
+    def text_delivered(self, latency_ms):
+        self.text_latencies.append(latency_ms)
+        self.changed.set()
+
+    def voice_delivered(self, room, received_ns):
+        started = self.voice_started.get(room)
+        if started is not None:
+            self.voice_latencies.setdefault(room, []).append((received_ns - started) / 1e6)
+        self.changed.set()
+
+    async def wait_for(self, predicate, timeout):
+        deadline = time.monotonic() + timeout
+        while not predicate():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            self.changed.clear()
+            try:
+                await asyncio.wait_for(self.changed.wait(), min(remaining, 0.5))
+            except asyncio.TimeoutError:
+                pass
+        return True
+
+
+async def wait_until_ready(base_http, proc, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"bench server exited with code {proc.returncode}")
+        try:
+            await asyncio.to_thread(http_get, f"{base_http}/supported_languages", 1)
+            return
+        except OSError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError("bench server did not start in time")
+
+
+async def run_text_phase(args, rooms, stats):
+    senders = [c for members in rooms.values() for c in members[:args.senders_per_room]]
+    interval = args.interval_ms / 1000
+
+    async def drive(client):
+        for seq in range(args.messages):
+            await client.send(seq)
+            if interval:
+                await asyncio.sleep(interval)
+
+    expected = sum(
+        len(members) * min(len(members), args.senders_per_room) * args.messages
+        for members in rooms.values()
+    )
+    started = time.perf_counter()
+    await asyncio.gather(*(drive(c) for c in senders))
+    complete = await stats.wait_for(lambda: len(stats.text_latencies) >= expected, args.drain_timeout)
+    duration = time.perf_counter() - started
+    return {
+        "sent": stats.sent,
+        "expected_deliveries": expected,
+        "deliveries": len(stats.text_latencies),
+        "complete": complete,
+        "duration_s": duration,
+        "messages_per_sec": stats.sent / duration if duration else None,
+        "deliveries_per_sec": len(stats.text_latencies) / duration if duration else None,
+        "latency_ms": summarize(stats.text_latencies),
+    }
+
+
+async def run_voice_phase(args, rooms, stats, base_http):
+    wav = synth_wav(args.voice_seconds)
+    request_latencies, failures = [], 0
+
+    async def drive(room, members):
+        nonlocal failures
+        speaker = members[0]
+        for _ in range(args.voice_messages):
+            before = len(stats.voice_latencies.get(room, []))
+            stats.voice_started[room] = time.time_ns()
+            started = time.perf_counter()
+            status, _ = await asyncio.to_thread(
+                http_post_multipart, f"{base_http}/voice_message",
+                {"username": f"u{speaker.client_id}", "room": room, "preferred_language": speaker.lang},
+                {"audio": ("bench.wav", wav, "audio/wav")},
+            )
+            request_latencies.append((time.perf_counter() - started) * 1000)
+            if status != 200:
+                failures += 1
+                continue
+            # One voice message at a time per room, so every delivery is attributable
+            await stats.wait_for(
+                lambda: len(stats.voice_latencies.get(room, [])) - before >= len(members), args.drain_timeout
+            )
+
+    started = time.perf_counter()
+    await asyncio.gather(*(drive(room, members) for room, members in rooms.items()))
+    duration = time.perf_counter() - started
+    sent = args.voice_messages * len(rooms)
+    delivery_latencies = [ms for latencies in stats.voice_latencies.values() for ms in latencies]
+    return {
+        "sent": sent,
+        "failed": failures,
+        "deliveries": len(delivery_latencies),
+        "duration_s": duration,
+        "messages_per_sec": sent / duration if duration else None,
+        "request_latency_ms": summarize(request_latencies),
+        "delivery_latency_ms": summarize(delivery_latencies),
+    }
+
+
+async def run(args):
+    workdir = args.workdir or tempfile.mkdtemp(prefix="translingo-bench-")
+    owns_workdir = args.workdir is None
+    port = args.port or free_port()
+    base_http = f"http://127.0.0.1:{port}"
+    base_ws = f"ws://127.0.0.1:{port}"
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    proc = subprocess.Popen(
+        [
+            sys.executable, "-m", "bench.server", "--port", str(port), "--workdir", workdir,
+            "--translate-latency-ms", str(args.translate_latency_ms),
+            "--tts-latency-ms", str(args.tts_latency_ms),
+            "--stt", args.stt, "--stt-latency-ms", str(args.stt_latency_ms),
+            "--stt-realtime-factor", str(args.stt_realtime_factor),
+            *(["--translate-batch-api"] if args.translate_batch_api else []),
+        ],
+        cwd=backend_dir,
+    )
+    languages = [lang.strip() for lang in args.languages.split(",") if lang.strip()]
+    clients = []
+    try:
+        await wait_until_ready(base_http, proc)
+        rss_idle = process_rss(proc.pid)
+
+        stats = Stats()
+        rooms = {}
+        for i in range(args.clients):
+            room = f"bench-room-{i % args.rooms}"
+            client = Client(i, room, languages[i % len(languages)], base_ws, stats)
+            rooms.setdefault(room, []).append(client)
+            clients.append(client)
+        for start in range(0, len(clients), args.connect_batch):
+            await asyncio.gather(*(c.connect() for c in clients[start:start + args.connect_batch]))
+        await asyncio.sleep(0.5)  # let the server settle before sampling memory
+        rss_connected = process_rss(proc.pid)
+
+        result = {
+            "config": {k: v for k, v in vars(args).items() if k != "output"},
+            "host": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+            "memory": {
+                "server_rss_idle_bytes": rss_idle,
+                "server_rss_connected_bytes": rss_connected,
+                "per_connection_bytes": (
+                    (rss_connected - rss_idle) / len(clients) if rss_idle and rss_connected and clients else None
+                ),
+            },
+            "text": await run_text_phase(args, rooms, stats),
+            "voice": await run_voice_phase(args, rooms, stats, base_http) if args.voice_messages else None,
+        }
+        result["memory"]["server_rss_end_bytes"] = process_rss(proc.pid)
+        metrics_text = (await asyncio.to_thread(http_get, f"{base_http}/metrics")).decode()
+        result["stages"] = parse_stage_metrics(metrics_text)
+        return result
+    finally:
+        await asyncio.gather(*(c.close() for c in clients if c.ws is not None), return_exceptions=True)
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+        if owns_workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=100, help="WebSocket clients in total")
+    parser.add_argument("--rooms", type=int, default=10)
+    parser.add_argument("--languages", default="en,hi,es,fr", help="assigned to clients round-robin")
+    parser.add_argument("--senders-per-room", type=int, default=2)
+    parser.add_argument("--messages", type=int, default=50, help="chat messages per sender")
+    parser.add_argument("--interval-ms", type=float, default=50.0, help="pause between a sender's messages")
+    parser.add_argument("--voice-messages", type=int, default=0, help="voice messages per room (needs ffmpeg)")
+    parser.add_argument("--voice-seconds", type=float, default=2.0, help="length of each voice clip")
+    parser.add_argument("--translate-latency-ms", type=float, default=30.0)
+    parser.add_argument("--translate-batch-api", action="store_true",
+                        help="stub translator answers a whole batch in one round trip")
+    parser.add_argument("--tts-latency-ms", type=float, default=80.0)
+    parser.add_argument("--stt", default="fake", help='"fake" or a Whisper size such as "tiny"')
+    parser.add_argument("--stt-latency-ms", type=float, default=200.0)
+    parser.add_argument("--stt-realtime-factor", type=float, default=0.1,
+                        help="fake STT only: extra seconds per second of audio")
+    parser.add_argument("--connect-batch", type=int, default=50, help="clients connecting at once")
+    parser.add_argument("--drain-timeout", type=float, default=60.0, help="seconds to wait for deliveries")
+    parser.add_argument("--port", type=int, default=0, help="0 picks a free port")
+    parser.add_argument("--workdir", default=None, help="defaults to a fresh temp directory")
+    parser.add_argument("--output", default=None, help="write the JSON here instead of stdout")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.clients < 1 or args.rooms < 1:
+        raise SystemExit("--clients and --rooms must be at least 1")
+    result = asyncio.run(run(args))
+    text = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Run the API with stub backends for offline benchmarking.
+
+    python -m bench.server --port 8765 --workdir /tmp/translingo-bench
+
+Normally started by ``bench.run``; run it directly to point other load tools at it.
+"""
+import argparse
+import os
+import sys
+
+
+def configure_environment(workdir, stt):
+    # Must happen before anything under app/ is imported: modules read their settings at import time
+    os.makedirs(workdir, exist_ok=True)
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ["ROOM_BUS"] = "memory"
+    os.environ["STT_EXECUTOR"] = "thread"
+    os.environ["TRANSLATION_CACHE_DB"] = ""
+    os.environ["TTS_CACHE_DIR"] = os.path.join(workdir, "tts")
+    # Keep startup's one-time file_map.json import away from the checkout's real uploads
+    os.environ["UPLOAD_DIR"] = os.path.join(workdir, "uploads")
+    os.environ["UPLOAD_BLOB_DIR"] = os.path.join(workdir, "uploads", "blobs")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    if stt == "fake":
+        os.environ["WHISPER_PRELOAD"] = ""
+    else:
+        os.environ["WHISPER_MODEL"] = stt
+        os.environ["WHISPER_MODEL_BY_LANGUAGE"] = ""
+        os.environ["WHISPER_MODEL_BY_ENDPOINT"] = ""
+        os.environ["WHISPER_PRELOAD"] = stt
+
+
+def install_stubs(args):
+    from app import main, voice_pipeline
+    from app.translate_batcher import translation_batcher
+    from bench.stubs import StubBackend, StubTranslator, make_speak_text, make_speech_to_text
+
+    # Detection still calls the translator directly; translation goes through the batcher
+    main.translator = StubTranslator(latency=args.translate_latency_ms / 1000)
+    translation_batcher.backend = StubBackend(
+        latency=args.translate_latency_ms / 1000, batching=args.translate_batch_api
+    )
+    voice_pipeline.speak_text = make_speak_text(latency=args.tts_latency_ms / 1000)
+    if args.stt == "fake":
+        main.speech_to_text = make_speech_to_text(
+            latency=args.stt_latency_ms / 1000, realtime_factor=args.stt_realtime_factor
+        )
+    return main.app
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workdir", default="bench-data", help="SQLite DB, TTS cache and uploads go here")
+    parser.add_argument("--translate-latency-ms", type=float, default=30.0)
+    parser.add_argument("--translate-batch-api", action="store_true",
+                        help="stub translator answers a whole batch in one round trip")
+    parser.add_argument("--tts-latency-ms", type=float, default=80.0)
+    parser.add_argument("--stt", default="fake", help='"fake" or a Whisper size such as "tiny"')
+    parser.add_argument("--stt-latency-ms", type=float, default=200.0, help="fake STT only")
+    parser.add_argument("--stt-realtime-factor", type=float, default=0.1,
+                        help="fake STT only: extra seconds per second of audio")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    configure_environment(args.workdir, args.stt)
+    app = install_stubs(args)
+
+    import uvicorn
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+import time
+from types import SimpleNamespace
+
+# Offline stand-ins for the network/model backends, each with a configurable
+# latency so benchmark runs are reproducible and never touch Google or Whisper.
+
+BENCH_PREFIX = "bench|"
+
+
+def bench_content(lang, client_id, seq, sent_ns):
+    """Chat message body that carries its language and send time through the pipeline."""
+    return f"{BENCH_PREFIX}{lang}|{client_id}|{seq}|{sent_ns}"
+
+
+def parse_bench_content(content):
+    """(lang, client_id, seq, sent_ns) for a bench message, else None."""
+    if not isinstance(content, str) or not content.startswith(BENCH_PREFIX):
+        return None
+    try:
+        lang, client_id, seq, sent_ns = content[len(BENCH_PREFIX):].split("|")
+        return lang, int(client_id), int(seq), int(sent_ns)
+    except ValueError:
+        return None
+
+
+class StubTranslator:
+    """Drop-in for googletrans.Translator: sleeps, then tags the text with its target language."""
+
+    def __init__(self, latency=0.0, default_lang="en"):
+        self.latency = latency
+        self.default_lang = default_lang
+
+    def translate(self, text, src="auto", dest="en"):
+        time.sleep(self.latency)
+        return SimpleNamespace(text=f"[{dest}] {text}", src=src, dest=dest)
+
+    def detect(self, text):
+        time.sleep(self.latency)
+        parsed = parse_bench_content(text)
+        return SimpleNamespace(lang=parsed[0] if parsed else self.default_lang, confidence=1.0)
+
+
+class StubBackend:
+    """app.translate_batcher.TranslationBackend stand-in: one sleep per call, like one round trip.
+
+    With ``batching`` off (googletrans' default) the batcher sends one text per
+    call; with it on, a whole batch shares one sleep. Duck-typed rather than
+    subclassed so the load client can import bench.stubs without the app package.
+    """
+
+    def __init__(self, latency=0.0, batching=False):
+        self.latency = latency
+        self.batching = batching
+        self.calls = 0
+
+    def supports_batching(self, src):
+        return self.batching
+
+    def translate(self, text, src, dest):
+        return self.translate_batch([text], src, dest)[0]
+
+    def translate_batch(self, texts, src, dest):
+        self.calls += 1
+        time.sleep(self.latency)
+        return [f"[{dest}] {text}" for text in texts]
+
+
+def make_speak_text(latency=0.0, bytes_per_char=200):
+    """Same signature as voice_translator.speak_text; writes a fake MP3 sized like gTTS output."""
+    def speak_text(text, lang='en', filename="output.mp3"):
+        time.sleep(latency)
+        with open(filename, "wb") as f:
+            f.write(b"ID3" + bytes(max(len(text), 1) * bytes_per_char))
+        return filename
+    return speak_text
+
+
+def make_speech_to_text(latency=0.0, realtime_factor=0.0, transcript="bench voice message"):
+    """Same signature as voice_translator.speech_to_text.
+
+    Sleeps ``latency`` plus ``realtime_factor`` seconds per second of audio.
+    """
+    def speech_to_text(audio="input.wav", language_code='hi', endpoint=None, model_size=None):
+        duration = len(audio) / 16000 if hasattr(audio, "__len__") else 0
+        time.sleep(latency + realtime_factor * duration)
+        return transcript
+    return speech_to_text